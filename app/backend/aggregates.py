@@ -0,0 +1,190 @@
+import os
+from collections import defaultdict
+from datetime import date, time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .models import (
+    DayItemTotal,
+    DaySlotTotal,
+    DaySummary,
+    DaySummaryItem,
+    DaySummarySlot,
+    Reservation,
+    ReservationItem,
+)
+
+# Per-day production counts (dishes per course, covers per arrival slot), kept up to date by
+# every reservation write in the same transaction, so the kitchen summary is a keyed read.
+# Writers describe the reservation before and after the change as footprints; the difference
+# is applied with one additive upsert per table.
+SUMMARY_SLOT_MINUTES = int(os.getenv("SUMMARY_SLOT_MINUTES", "30"))
+COURSE_ORDER = {"entrée": 0, "plat": 1, "dessert": 2}
+
+# (service_date, arrival_time, pax, ((type, name, quantity), ...) or None when items are unchanged)
+Footprint = Tuple[date, time, int, Optional[Tuple[Tuple[str, str, int], ...]]]
+
+
+def footprint(res: Reservation, items: Optional[Iterable[ReservationItem]] = None) -> Footprint:
+    """State of a reservation as counted in the aggregates.
+
+    items=None on both sides of a change means the items did not move (same day, same items).
+    """
+    its = None if items is None else tuple((it.type, it.name, int(it.quantity or 0)) for it in items)
+    return (res.service_date, res.arrival_time, int(res.pax or 0), its)
+
+
+def slot_of(t: time) -> time:
+    minutes = (t.hour * 60 + t.minute) // SUMMARY_SLOT_MINUTES * SUMMARY_SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def _deltas(before: Sequence[Footprint], after: Sequence[Footprint]):
+    items: Dict[Tuple[date, str, str], int] = defaultdict(int)
+    slots: Dict[Tuple[date, time], List[int]] = defaultdict(lambda: [0, 0])
+    for sign, footprints in ((-1, before), (1, after)):
+        for d, t, pax, its in footprints:
+            slot = slots[(d, slot_of(t))]
+            slot[0] += sign
+            slot[1] += sign * pax
+            for typ, name, qty in its or ():
+                items[(d, typ, name)] += sign * qty
+    return (
+        {k: v for k, v in items.items() if v},
+        {k: v for k, v in slots.items() if v[0] or v[1]},
+    )
+
+
+def _upsert(dialect: str, model, rows: List[dict], keys: List[str], counters: List[str]):
+    if dialect == "postgresql":
+        stmt = pg_insert(model).values(rows)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(model).values(rows)
+    else:
+        raise NotImplementedError(f"Day aggregates are not supported on {dialect}")
+    table = model.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: table.c[c] + stmt.excluded[c] for c in counters},
+    )
+
+
+def aggregate_statements(dialect: str, before: Sequence[Footprint], after: Sequence[Footprint]) -> list:
+    """Statements moving the aggregates from the `before` footprints to the `after` ones."""
+    item_deltas, slot_deltas = _deltas(before, after)
+    stmts = []
+    if item_deltas:
+        rows = [{"service_date": d, "type": t, "name": n, "quantity": q} for (d, t, n), q in item_deltas.items()]
+        stmts.append(_upsert(dialect, DayItemTotal, rows, ["service_date", "type", "name"], ["quantity"]))
+    if slot_deltas:
+        rows = [
+            {"service_date": d, "slot": s, "reservations": r, "covers": c}
+            for (d, s), (r, c) in slot_deltas.items()
+        ]
+        stmts.append(_upsert(dialect, DaySlotTotal, rows, ["service_date", "slot"], ["reservations", "covers"]))
+    # Rows can only reach zero when a counter went down
+    item_days = {d for (d, _, _), q in item_deltas.items() if q < 0}
+    slot_days = {d for (d, _), (r, _) in slot_deltas.items() if r < 0}
+    if item_days:
+        stmts.append(delete(DayItemTotal).where(and_(DayItemTotal.service_date.in_(item_days), DayItemTotal.quantity <= 0)))
+    if slot_days:
+        stmts.append(delete(DaySlotTotal).where(and_(DaySlotTotal.service_date.in_(slot_days), DaySlotTotal.reservations <= 0)))
+    return stmts
+
+
+def apply_aggregates(session: Session, before: Sequence[Footprint], after: Sequence[Footprint]) -> None:
+    for stmt in aggregate_statements(session.get_bind().dialect.name, before, after):
+        session.exec(stmt)
+
+
+async def apply_aggregates_async(session: AsyncSession, before: Sequence[Footprint], after: Sequence[Footprint]) -> None:
+    for stmt in aggregate_statements(session.bind.dialect.name, before, after):
+        await session.exec(stmt)
+
+
+def rebuild_day_aggregates(conn: Connection) -> None:
+    """Recompute every day from reservation/reservationitem (GROUP BY per table)."""
+    conn.execute(delete(DayItemTotal))
+    conn.execute(delete(DaySlotTotal))
+    item_rows = conn.execute(
+        select(Reservation.service_date, ReservationItem.type, ReservationItem.name, func.sum(ReservationItem.quantity))
+        .join(Reservation, Reservation.id == ReservationItem.reservation_id)
+        .group_by(Reservation.service_date, ReservationItem.type, ReservationItem.name)
+    ).all()
+    slots: Dict[Tuple[date, time], List[int]] = defaultdict(lambda: [0, 0])
+    for d, t, n, covers in conn.execute(
+        select(Reservation.service_date, Reservation.arrival_time, func.count(), func.sum(Reservation.pax))
+        .group_by(Reservation.service_date, Reservation.arrival_time)
+    ).all():
+        slot = slots[(d, slot_of(t))]
+        slot[0] += int(n)
+        slot[1] += int(covers or 0)
+    if item_rows:
+        conn.execute(DayItemTotal.__table__.insert(), [
+            {"service_date": d, "type": t, "name": n, "quantity": int(q)} for d, t, n, q in item_rows if q and q > 0
+        ])
+    if slots:
+        conn.execute(DaySlotTotal.__table__.insert(), [
+            {"service_date": d, "slot": s, "reservations": r, "covers": c} for (d, s), (r, c) in slots.items()
+        ])
+
+
+async def day_summary(session: AsyncSession, d: date) -> DaySummary:
+    items = (await session.exec(select(DayItemTotal).where(DayItemTotal.service_date == d))).all()
+    slots = (await session.exec(
+        select(DaySlotTotal).where(DaySlotTotal.service_date == d).order_by(DaySlotTotal.slot.asc())
+    )).all()
+    items = sorted(items, key=lambda it: (COURSE_ORDER.get(it.type, len(COURSE_ORDER)), it.type, it.name))
+    by_type: Dict[str, int] = {}
+    for it in items:
+        by_type[it.type] = by_type.get(it.type, 0) + it.quantity
+    return DaySummary(
+        service_date=d,
+        reservations=sum(s.reservations for s in slots),
+        covers=sum(s.covers for s in slots),
+        slot_minutes=SUMMARY_SLOT_MINUTES,
+        by_type=by_type,
+        items=[DaySummaryItem(type=it.type, name=it.name, quantity=it.quantity) for it in items],
+        slots=[DaySummarySlot(slot=s.slot, reservations=s.reservations, covers=s.covers) for s in slots],
+    )
+
+
+def production_sheet_data(session: Session, d: date) -> Dict[str, Any]:
+    """Dish totals of a day per arrival slot, for the kitchen production sheet.
+
+    One GROUP BY (arrival time, type, name) over the day's items; reservations and covers
+    per slot come from dayslottotal.
+    """
+    dish_rows = session.exec(
+        select(Reservation.arrival_time, ReservationItem.type, ReservationItem.name, func.sum(ReservationItem.quantity))
+        .join(Reservation, Reservation.id == ReservationItem.reservation_id)
+        .where(Reservation.service_date == d)
+        .group_by(Reservation.arrival_time, ReservationItem.type, ReservationItem.name)
+    ).all()
+    slots: Dict[time, Dict[str, Any]] = {
+        s.slot: {"slot": s.slot, "reservations": s.reservations, "covers": s.covers, "items": defaultdict(int)}
+        for s in session.exec(select(DaySlotTotal).where(DaySlotTotal.service_date == d)).all()
+    }
+    for t, typ, name, qty in dish_rows:
+        slot = slots.setdefault(slot_of(t), {"slot": slot_of(t), "reservations": 0, "covers": 0, "items": defaultdict(int)})
+        slot["items"][(typ, name)] += int(qty or 0)
+    ordered = [slots[k] for k in sorted(slots)]
+    totals: Dict[Tuple[str, str], int] = defaultdict(int)
+    for slot in ordered:
+        for key, qty in slot["items"].items():
+            totals[key] += qty
+        slot["items"] = [(typ, name, qty) for (typ, name), qty in sorted(slot["items"].items()) if qty > 0]
+    return {
+        "service_date": d,
+        "slot_minutes": SUMMARY_SLOT_MINUTES,
+        "reservations": sum(s["reservations"] for s in ordered),
+        "covers": sum(s["covers"] for s in ordered),
+        "items": [(typ, name, qty) for (typ, name), qty in sorted(totals.items()) if qty > 0],
+        "slots": ordered,
+    }
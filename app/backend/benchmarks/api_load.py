@@ -0,0 +1,104 @@
+"""Reservation API under concurrent load: sync Session handlers vs the async handlers.
+
+    DATABASE_URL=postgresql://... python -m app.backend.benchmarks.api_load [requests] [concurrency]
+
+The sync stack is the previous implementation (def handlers on get_session, run in
+Starlette's threadpool); the async stack is the app's own router. Both hit the same
+database, so point DATABASE_URL at a disposable copy: 200 reservations are seeded.
+Keep concurrency below the threadpool size (40): past it, and past the pool capacity,
+the sync stack stalls on pool timeouts because session teardown needs a thread too.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, time as dtime, timedelta
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlmodel import Session, select
+
+from ..database import get_session, init_db, session_context
+from ..main import app as async_app, log_requests
+from ..models import Reservation, ReservationItem, ReservationRead
+from ..routers.reservations import _to_read_models
+
+sync_app = FastAPI()
+# Same request-logging middleware as the real app, so only the handlers differ
+sync_app.middleware("http")(log_requests)
+
+
+@sync_app.get("/api/reservations", response_model=List[ReservationRead])
+def sync_list(limit: int = 50, session: Session = Depends(get_session)):
+    stmt = select(Reservation).order_by(Reservation.service_date.desc(), Reservation.arrival_time.asc()).limit(limit)
+    return _to_read_models(session, session.exec(stmt).all())
+
+
+@sync_app.get("/api/reservations/{reservation_id}", response_model=ReservationRead)
+def sync_get(reservation_id: uuid.UUID, session: Session = Depends(get_session)):
+    res = session.get(Reservation, reservation_id)
+    if not res:
+        raise HTTPException(404, "Reservation not found")
+    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
+    return ReservationRead(**res.model_dump(), items=items)
+
+
+def seed(n: int = 200) -> List[uuid.UUID]:
+    init_db()
+    ids = []
+    with session_context() as session:
+        for i in range(n):
+            r = Reservation(
+                client_name=f"Bench {uuid.uuid4().hex[:8]}", pax=20, service_date=date(2031, 1, 1) + timedelta(days=i % 30),
+                arrival_time=dtime(12 + i % 10, 0), drink_formula="Vin",
+            )
+            session.add(r)
+            for t in ("entrée", "plat", "dessert"):
+                session.add(ReservationItem(type=t, name=f"{t} {i}", quantity=5, reservation_id=r.id))
+            ids.append(r.id)
+        session.commit()
+    return ids
+
+
+async def load(app, paths: List[str], concurrency: int) -> tuple[float, List[float]]:
+    latencies: List[float] = []
+    queue = list(paths)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while queue:
+            path = queue.pop()
+            t0 = time.perf_counter()
+            resp = await client.get(path)
+            resp.raise_for_status()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        return time.perf_counter() - t0, latencies
+
+
+async def run(requests: int, concurrency: int) -> None:
+    ids = seed()
+    paths = [f"/api/reservations/{ids[i % len(ids)]}" if i % 4 else "/api/reservations?limit=50" for i in range(requests)]
+    # warm-up: open pool connections, import lazily loaded modules
+    await load(sync_app, paths[:concurrency], concurrency)
+    await load(async_app, paths[:concurrency], concurrency)
+
+    print(f"{requests} requests, concurrency {concurrency}, {os.getenv('DATABASE_URL', 'sqlite')!s:.40}")
+    for name, app in (("sync ", sync_app), ("async", async_app)):
+        elapsed, lat = await load(app, paths, concurrency)
+        lat.sort()
+        print(
+            f"{name}: {requests / elapsed:8.1f} req/s   p50 {statistics.median(lat):7.1f} ms"
+            f"   p95 {lat[int(len(lat) * 0.95) - 1]:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    # One event loop for the whole run: the async pool's connections belong to it
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, int(sys.argv[2]) if len(sys.argv) > 2 else 32))
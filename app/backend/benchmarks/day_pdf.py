@@ -0,0 +1,55 @@
+"""Day sheet rendering: single process vs process pool.
+
+    python -m app.backend.benchmarks.day_pdf [reservations] [workers]
+"""
+import os
+import sys
+import time
+from datetime import date, time as dtime
+
+from pypdf import PdfReader
+
+from ..models import Reservation, ReservationItem
+from ..pdf_service import PDF_DAY_CHUNK_SIZE, generate_day_pdf
+
+
+def build_day(n: int):
+    d = date(2030, 6, 15)
+    reservations, items_by_res = [], {}
+    for i in range(n):
+        r = Reservation(
+            client_name=f"Groupe {i}", pax=20 + i % 30, service_date=d,
+            arrival_time=dtime(12 + i % 10, (i * 5) % 60), drink_formula="Vin + softs",
+            notes="\n".join(f"- note {j} *allergie* [color=#ff0000]noix[/color]" for j in range(i % 60)),
+        )
+        reservations.append(r)
+        items_by_res[str(r.id)] = [
+            ReservationItem(type=t, name=f"{t} {k}", quantity=3, reservation_id=r.id)
+            for t in ("entrée", "plat", "dessert") for k in range(4)
+        ]
+    return d, reservations, items_by_res
+
+
+def run(n: int, workers: int) -> None:
+    d, reservations, items_by_res = build_day(n)
+    # warm-up: spawn every pool worker once, as a long-running server would
+    generate_day_pdf(d, reservations[:workers * (PDF_DAY_CHUNK_SIZE + 1)], items_by_res, workers=workers)
+
+    t0 = time.perf_counter()
+    path = generate_day_pdf(d, reservations, items_by_res, workers=1)
+    single = time.perf_counter() - t0
+    single_pages = len(PdfReader(path).pages)
+
+    t0 = time.perf_counter()
+    path = generate_day_pdf(d, reservations, items_by_res, workers=workers)
+    parallel = time.perf_counter() - t0
+    parallel_pages = len(PdfReader(path).pages)
+
+    print(f"{n} reservations, {os.cpu_count()} CPUs")
+    print(f"single process : {single * 1000:8.1f} ms  ({single_pages} pages)")
+    print(f"{workers} workers      : {parallel * 1000:8.1f} ms  ({parallel_pages} pages)")
+    print(f"speedup        : {single / parallel:8.2f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 400, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,46 @@
+"""Per-fiche setup cost: styles/fonts/regexes rebuilt on every call (previous behaviour) vs the shared registry.
+
+    python -m app.backend.benchmarks.fiche_pdf [iterations]
+"""
+import sys
+import time
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from ..pdf_service import _PdfTemplates, get_pdf_templates, render_reservation_pdf
+from .day_pdf import build_day
+
+
+def _per_call_setup() -> None:
+    # What every fiche used to pay before drawing anything
+    _PdfTemplates()
+    try:
+        pdfmetrics.registerFont(TTFont('Courier', 'Courier'))
+    except Exception:
+        pass
+
+
+def _timed(fn, iterations: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations * 1000
+
+
+def run(iterations: int) -> None:
+    _, reservations, items_by_res = build_day(1)
+    r = reservations[0]
+    get_pdf_templates()
+
+    before = _timed(_per_call_setup, iterations)
+    after = _timed(get_pdf_templates, iterations)
+    render = _timed(lambda: render_reservation_pdf(r, items_by_res[str(r.id)]), iterations)
+
+    print(f"setup per fiche, before : {before:8.4f} ms")
+    print(f"setup per fiche, after  : {after:8.4f} ms")
+    print(f"full fiche render (now) : {render:8.4f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -1,9 +1,20 @@
+import math
 import os
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 
+from fastapi import Request, Response
 from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .search_service import fold
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data.db")
 
@@ -11,82 +22,204 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+# Connection pool, tunable per deployment (Railway Postgres closes idle connections:
+# pre-ping + recycle avoid handing out dead ones)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
 
-def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+class PoolMetrics:
+    """Checkout latency (last 1000 checkouts), overflow checkouts and timeouts."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=1000)
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.max_latency_ms = 0.0
+
+    def record(self, latency_ms: float, overflowed: bool) -> None:
+        with self._lock:
+            self._latencies.append(latency_ms)
+            self.checkouts += 1
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            if overflowed:
+                self.overflow_checkouts += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._latencies)
+            return {
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "latency_ms": {
+                    "avg": round(sum(recent) / len(recent), 3) if recent else 0.0,
+                    "p95": round(recent[int(len(recent) * 0.95) - 1], 3) if recent else 0.0,
+                    "max": round(self.max_latency_ms, 3),
+                },
+            }
+
+
+class _TimedCheckout:
+    # Times the wait for a pooled connection (pool events only fire once it is obtained)
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record((time.perf_counter() - start) * 1000, self.overflow() > 0)
+        return conn
+
+
+def _timed_pool(base, metrics: PoolMetrics):
+    return type(f"Timed{base.__name__}", (_TimedCheckout, base), {"metrics": metrics})
+
+
+def _engine_kwargs(url: str, poolclass) -> Dict[str, Any]:
+    if url.startswith("sqlite"):
+        kwargs: Dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite:/"):
+            return kwargs
+    else:
+        kwargs = {"connect_args": {}}
+    kwargs.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return kwargs
+
+
+def _async_url(url: str):
+    """Same database through an asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql":
+        query = dict(u.query)
+        # asyncpg has no sslmode parameter; it takes ssl= instead
+        sslmode = query.pop("sslmode", None)
+        return u.set(drivername="postgresql+asyncpg", query=query), ({"ssl": sslmode} if sslmode else {})
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite"), {}
+    return u, {}
+
+
+def _sqlite_pragmas(database: Optional[str], read_only: bool):
+    def on_connect(dbapi_conn, _record) -> None:
+        # WAL lets readers run while a write is in progress; busy_timeout waits for the lock instead of failing
+        cursor = dbapi_conn.cursor()
+        if database not in (None, "", ":memory:"):
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+        # fold(): accent/case folding for the client-name substring filter (see search_service)
+        dbapi_conn.create_function("fold", 1, fold, deterministic=True)
+    return on_connect
+
+
+def _make_engines(url: str, read_only: bool = False):
+    """Sync engine (startup, PDF exports, Zenchef engine) and async engine (request handlers) for one database."""
+    sync_metrics, async_metrics = PoolMetrics(), PoolMetrics()
+    sync_kwargs = _engine_kwargs(url, _timed_pool(QueuePool, sync_metrics))
+    async_db_url, async_connect_args = _async_url(url)
+    async_kwargs = _engine_kwargs(url, _timed_pool(AsyncAdaptedQueuePool, async_metrics))
+    async_kwargs["connect_args"] = {**async_kwargs["connect_args"], **async_connect_args}
+    if read_only and url.startswith("postgresql"):
+        # A replica refuses writes anyway; this also guards a read URL that points at a primary
+        sync_kwargs["connect_args"]["options"] = "-c default_transaction_read_only=on"
+        async_kwargs["connect_args"]["server_settings"] = {"default_transaction_read_only": "on"}
+    sync_engine = create_engine(url, echo=False, **sync_kwargs)
+    # Request handlers use the async engine: DB waits no longer hold a threadpool thread
+    async_engine = create_async_engine(async_db_url, echo=False, **async_kwargs)
+    if sync_engine.url.get_backend_name() == "sqlite":
+        on_connect = _sqlite_pragmas(sync_engine.url.database, read_only)
+        event.listen(sync_engine, "connect", on_connect)
+        event.listen(async_engine.sync_engine, "connect", on_connect)
+    return sync_engine, async_engine
+
+
+engine, async_engine = _make_engines(DATABASE_URL)
+
+# Optional read replica for list/PDF traffic; without one, reads go to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+if DATABASE_READ_URL:
+    read_engine, read_async_engine = _make_engines(DATABASE_READ_URL, read_only=True)
+else:
+    read_engine, read_async_engine = engine, async_engine
+
+# Read-your-writes: a client that just wrote is sent to the primary until the replica caught up
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary_until"
 
 
-def run_startup_migrations() -> None:
-    """Idempotent migrations for PostgreSQL in production.
-    - Remove duplicates on (service_date, arrival_time, client_name, pax)
-    - Add CHECK pax >= 1 (if missing)
-    - Add UNIQUE constraint on slot (if missing)
-    - Add composite index on (service_date, arrival_time)
-    """
-    backend = engine.url.get_backend_name()
-    if backend != 'postgresql':
+def mark_recent_write(response: Response) -> None:
+    if read_engine is engine or READ_YOUR_WRITES_SECONDS <= 0:
         return
-    with engine.begin() as conn:
-        # Remove duplicates, keep earliest by created_at
-        conn.execute(text(
-            """
-            WITH dup AS (
-              SELECT id,
-                     ROW_NUMBER() OVER (
-                       PARTITION BY service_date, arrival_time, client_name, pax
-                       ORDER BY created_at
-                     ) AS rn
-              FROM reservation
-            )
-            DELETE FROM reservation r
-            USING dup d
-            WHERE r.id = d.id AND d.rn > 1;
-            """
-        ))
-
-        # Add CHECK constraint if missing
-        conn.execute(text(
-            """
-            DO $$
-            BEGIN
-              IF NOT EXISTS (
-                SELECT 1 FROM pg_constraint
-                WHERE conname = 'ck_reservation_pax_min'
-              ) THEN
-                ALTER TABLE reservation
-                  ADD CONSTRAINT ck_reservation_pax_min CHECK (pax >= 1);
-              END IF;
-            END$$;
-            """
-        ))
-
-        # Add UNIQUE constraint if missing
-        conn.execute(text(
-            """
-            DO $$
-            BEGIN
-              IF NOT EXISTS (
-                SELECT 1 FROM pg_constraint
-                WHERE conname = 'uq_reservation_slot'
-              ) THEN
-                ALTER TABLE reservation
-                  ADD CONSTRAINT uq_reservation_slot
-                  UNIQUE (service_date, arrival_time, client_name, pax);
-              END IF;
-            END$$;
-            """
-        ))
-
-        # Add index (idempotent)
-        conn.execute(text(
-            """
-            CREATE INDEX IF NOT EXISTS ix_reservation_date_time
-              ON reservation (service_date, arrival_time);
-            """
-        ))
+    until = time.time() + READ_YOUR_WRITES_SECONDS
+    response.set_cookie(READ_PRIMARY_COOKIE, f"{until:.3f}", max_age=int(math.ceil(READ_YOUR_WRITES_SECONDS)), httponly=True, samesite="lax")
+
+
+def wrote_recently(request: Optional[Request]) -> bool:
+    if request is None or read_engine is engine:
+        return False
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+def _pool_status(pool) -> Dict[str, Any]:
+    status: Dict[str, Any] = {"pool": pool.__class__.__name__}
+    if isinstance(pool, _TimedCheckout):
+        status.update(pool.metrics.snapshot())
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout_seconds=DB_POOL_TIMEOUT,
+        )
+    return status
+
+
+def pool_status() -> Dict[str, Any]:
+    status = {
+        **_pool_status(engine.pool),
+        "async": _pool_status(async_engine.pool),
+    }
+    if read_engine is not engine:
+        status["read"] = {
+            **_pool_status(read_engine.pool),
+            "async": _pool_status(read_async_engine.pool),
+        }
+    return status
+
+
+def init_db() -> None:
+    # Tables only; column/constraint/index changes are versioned steps in migrations.py
+    SQLModel.metadata.create_all(engine)
 
 
 @contextmanager
@@ -98,3 +231,27 @@ def session_context() -> Generator[Session, None, None]:
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: attributes stay loaded after commit (no implicit lazy IO in async code)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@contextmanager
+def read_session_context(primary: bool = False) -> Generator[Session, None, None]:
+    with Session(engine if primary else read_engine) as session:
+        yield session
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    with read_session_context(primary=wrote_recently(request)) as session:
+        yield session
+
+
+async def get_async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Read-only traffic (lists, PDFs) goes to DATABASE_READ_URL unless this client just wrote
+    bind = async_engine if wrote_recently(request) else read_async_engine
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from .database import session_context
+from .models import ProcessedRequest
+
+# Idempotency-Key store: one processedrequest row per key holding the original JSON
+# response, expired after IDEMPOTENCY_TTL_SECONDS by a periodic purge. Finished keys
+# are also kept in a small per-process LRU so replays never touch the DB.
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+# A claim with no response after this long belongs to a request that died (crash, redeploy):
+# the key is handed to the next retry. Same default as the Zenchef sync lock TTL.
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", str(30 * 60)))
+
+# claim() outcomes
+CLAIMED = "claimed"
+IN_PROGRESS = "in_progress"
+
+
+class _ResponseCache:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                return None
+            created_at, response = hit
+            if _expired(created_at):
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return response
+
+    def put(self, key: str, created_at: datetime, response: Dict[str, Any]) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (created_at, response)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+_cache = _ResponseCache(IDEMPOTENCY_CACHE_SIZE)
+
+
+def _expired(created_at: datetime) -> bool:
+    return created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+
+
+def _lease_lapsed(created_at: datetime) -> bool:
+    return created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+
+
+def claim(session: Session, key: str) -> Any:
+    """Reserve key for a new request.
+
+    Returns CLAIMED, IN_PROGRESS (another request with this key has not finished yet and
+    its lease has not lapsed), or the stored response dict of the request that already
+    completed. Only finished responses are kept for the full TTL.
+    """
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    row = session.get(ProcessedRequest, key)
+    if row is not None and _expired(row.created_at):
+        # Not purged yet: treat as a new key
+        session.delete(row)
+        session.commit()
+        row = None
+    if row is not None:
+        if row.response is None:
+            if not _lease_lapsed(row.created_at):
+                return IN_PROGRESS
+            # Abandoned claim: take it over, unless a concurrent retry just did
+            result = session.exec(
+                update(ProcessedRequest)
+                .where(
+                    ProcessedRequest.key == key,
+                    ProcessedRequest.response.is_(None),
+                    ProcessedRequest.created_at == row.created_at,
+                )
+                .values(created_at=datetime.utcnow())
+            )
+            session.commit()
+            return CLAIMED if result.rowcount == 1 else IN_PROGRESS
+        response = json.loads(row.response)
+        _cache.put(key, row.created_at, response)
+        return response
+    try:
+        session.add(ProcessedRequest(key=key))
+        session.commit()
+        return CLAIMED
+    except IntegrityError:
+        # Lost a race with a concurrent request using the same key
+        session.rollback()
+        return IN_PROGRESS
+
+
+def complete(session: Session, key: str, response: Dict[str, Any]) -> None:
+    """Store the response of a claimed key so retries replay it."""
+    row = session.get(ProcessedRequest, key)
+    if row is None:
+        return
+    data = jsonable_encoder(response)
+    row.response = json.dumps(data)
+    session.add(row)
+    session.commit()
+    _cache.put(key, row.created_at, data)
+
+
+def release(session: Session, key: str) -> None:
+    """Forget a claimed key whose request failed, so the client can retry it."""
+    session.exec(delete(ProcessedRequest).where(ProcessedRequest.key == key))
+    session.commit()
+    _cache.discard(key)
+
+
+def purge_expired(session: Session) -> int:
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    lease_cutoff = now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    result = session.exec(delete(ProcessedRequest).where(or_(
+        ProcessedRequest.created_at < cutoff,
+        and_(ProcessedRequest.response.is_(None), ProcessedRequest.created_at < lease_cutoff),
+    )))
+    session.commit()
+    return result.rowcount or 0
+
+
+def _purge() -> int:
+    with session_context() as session:
+        return purge_expired(session)
+
+
+# --- Background purge ---
+
+_purge_task: Optional[asyncio.Task] = None
+
+
+async def _purge_loop(interval: int) -> None:
+    while True:
+        try:
+            await run_in_threadpool(_purge)
+        except Exception as e:
+            print(f"Idempotency key purge failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_purge() -> None:
+    global _purge_task
+    if IDEMPOTENCY_PURGE_INTERVAL_SECONDS > 0 and _purge_task is None:
+        _purge_task = asyncio.get_running_loop().create_task(_purge_loop(IDEMPOTENCY_PURGE_INTERVAL_SECONDS))
+
+
+async def stop_purge() -> None:
+    global _purge_task
+    if _purge_task is not None:
+        _purge_task.cancel()
+        try:
+            await _purge_task
+        except asyncio.CancelledError:
+            pass
+        _purge_task = None
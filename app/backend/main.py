@@ -9,8 +9,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, Response
 
-from .database import init_db, run_startup_migrations, session_context
+from .database import init_db, mark_recent_write, pool_status, session_context
+from .migrations import run_startup_migrations
 from .routers import reservations, menu_items, zenchef
+from .idempotency import start_purge, stop_purge
+from .zenchef_sync import start_scheduler, stop_scheduler
 
 load_dotenv()
 
@@ -23,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 # Routers
@@ -32,17 +36,33 @@ app.include_router(zenchef.router)
 
 # Ensure DB
 init_db()
-# Apply idempotent startup migrations automatically on Railway (PostgreSQL)
+# Apply pending versioned migrations (each step once; a single SELECT when up to date)
 try:
     run_startup_migrations()
 except Exception as e:
     print(f"Startup migrations skipped due to error: {e}")
 
-# Static serving for built frontend if available
-backend_dir = Path(__file__).parent
-frontend_dist = (backend_dir / "../frontend/dist").resolve()
-if frontend_dist.exists():
-    app.mount("/", StaticFiles(directory=str(frontend_dist), html=True), name="static")
+
+# Periodic Zenchef sync (ZENCHEF_SYNC_INTERVAL_SECONDS > 0); single-flight across workers
+@app.on_event("startup")
+async def start_zenchef_scheduler():
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+async def stop_zenchef_scheduler():
+    await stop_scheduler()
+
+
+# Periodic purge of expired Idempotency-Key rows
+@app.on_event("startup")
+async def start_idempotency_purge():
+    start_purge()
+
+
+@app.on_event("shutdown")
+async def stop_idempotency_purge():
+    await stop_purge()
 
 
 # --- Correlation & Request logging middleware ---
@@ -68,6 +88,15 @@ async def log_requests(request: Request, call_next):
         raise
 
 
+# --- Read-your-writes: after a successful write, this client reads from the primary for a few seconds ---
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        mark_recent_write(response)
+    return response
+
+
 # --- Exception handlers ---
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -99,3 +128,17 @@ async def health():
     except Exception:
         ok_db = False
     return {"status": "ok", "db": ok_db}
+
+
+# --- DB pool metrics ---
+@app.get("/health/pool")
+async def health_pool():
+    return pool_status()
+
+
+# Static serving for built frontend if available. Mounted last: the catch-all "/" mount
+# would otherwise shadow every route declared after it (/health, /health/pool, ...)
+backend_dir = Path(__file__).parent
+frontend_dist = (backend_dir / "../frontend/dist").resolve()
+if frontend_dist.exists():
+    app.mount("/", StaticFiles(directory=str(frontend_dist), html=True), name="static")
@@ -0,0 +1,202 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .aggregates import rebuild_day_aggregates
+from .database import engine
+from .models import SchemaMigration
+from .search_service import install_client_search
+
+# Versioned startup migrations. Each step runs once per database and is recorded in the
+# schemamigration ledger; a boot where every step is recorded costs a single SELECT.
+# On PostgreSQL the first worker to find pending steps takes an advisory lock and the
+# others wait for it, then find the ledger complete.
+PG_MIGRATION_LOCK_ID = 72_410_002
+
+
+def _add_reservation_zenchef_id(conn: Connection) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns("reservation")}
+    if "zenchef_id" not in columns:
+        conn.execute(text("ALTER TABLE reservation ADD COLUMN zenchef_id VARCHAR"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_reservation_zenchef_id ON reservation (zenchef_id)"))
+
+
+def _add_processedrequest_response(conn: Connection) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns("processedrequest")}
+    if "response" not in columns:
+        conn.execute(text("ALTER TABLE processedrequest ADD COLUMN response TEXT"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_processedrequest_created_at ON processedrequest (created_at)"
+    ))
+
+
+def _dedup_reservation_slots(conn: Connection) -> None:
+    # Remove duplicates, keep earliest by created_at (must precede the UNIQUE constraint)
+    conn.execute(text(
+        """
+        WITH dup AS (
+          SELECT id,
+                 ROW_NUMBER() OVER (
+                   PARTITION BY service_date, arrival_time, client_name, pax
+                   ORDER BY created_at
+                 ) AS rn
+          FROM reservation
+        )
+        DELETE FROM reservation r
+        USING dup d
+        WHERE r.id = d.id AND d.rn > 1;
+        """
+    ))
+
+
+def _add_pax_check(conn: Connection) -> None:
+    conn.execute(text(
+        """
+        DO $$
+        BEGIN
+          IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'ck_reservation_pax_min'
+          ) THEN
+            ALTER TABLE reservation
+              ADD CONSTRAINT ck_reservation_pax_min CHECK (pax >= 1);
+          END IF;
+        END$$;
+        """
+    ))
+
+
+def _add_slot_unique(conn: Connection) -> None:
+    conn.execute(text(
+        """
+        DO $$
+        BEGIN
+          IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'uq_reservation_slot'
+          ) THEN
+            ALTER TABLE reservation
+              ADD CONSTRAINT uq_reservation_slot
+              UNIQUE (service_date, arrival_time, client_name, pax);
+          END IF;
+        END$$;
+        """
+    ))
+
+
+def _add_date_time_index(conn: Connection) -> None:
+    conn.execute(text(
+        """
+        CREATE INDEX IF NOT EXISTS ix_reservation_date_time
+          ON reservation (service_date, arrival_time);
+        """
+    ))
+
+
+def _ensure_date_time_index(conn: Connection) -> None:
+    # 0006 was only run on PostgreSQL; SQLite databases created before the index was
+    # declared on the model never got it from create_all
+    _add_date_time_index(conn)
+
+
+def _ensure_slot_unique_sqlite(conn: Connection) -> None:
+    # SQLite cannot add a constraint to an existing table: enforce it with a unique index
+    slot = ["service_date", "arrival_time", "client_name", "pax"]
+    insp = inspect(conn)
+    if any(sorted(u["column_names"]) == sorted(slot) for u in insp.get_unique_constraints("reservation")):
+        return
+    if any(ix.get("unique") and sorted(ix["column_names"]) == sorted(slot) for ix in insp.get_indexes("reservation")):
+        return
+    # Same rule as 0003: keep the earliest reservation of each slot, with its items
+    dup = """
+        SELECT id FROM (
+          SELECT id,
+                 ROW_NUMBER() OVER (
+                   PARTITION BY service_date, arrival_time, client_name, pax
+                   ORDER BY created_at
+                 ) AS rn
+          FROM reservation
+        ) WHERE rn > 1
+    """
+    conn.execute(text(f"DELETE FROM reservationitem WHERE reservation_id IN ({dup})"))
+    removed = conn.execute(text(f"DELETE FROM reservation WHERE id IN ({dup})")).rowcount
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_reservation_slot "
+        "ON reservation (service_date, arrival_time, client_name, pax)"
+    ))
+    if removed:
+        rebuild_day_aggregates(conn)
+
+
+def _add_reservationitem_reservation_index(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_reservationitem_reservation_id ON reservationitem (reservation_id)"
+    ))
+
+
+# (name, step, backends it applies to; None = all). Append only: names are the ledger keys.
+# Steps for another backend are recorded without running (create_all already covers them there).
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None], Optional[Set[str]]]] = [
+    ("0001_reservation_zenchef_id", _add_reservation_zenchef_id, None),
+    ("0002_processedrequest_response", _add_processedrequest_response, None),
+    ("0003_reservation_dedup_slots", _dedup_reservation_slots, {"postgresql"}),
+    ("0004_reservation_pax_check", _add_pax_check, {"postgresql"}),
+    ("0005_reservation_slot_unique", _add_slot_unique, {"postgresql"}),
+    ("0006_reservation_date_time_index", _add_date_time_index, {"postgresql"}),
+    # pg_trgm + unaccent on PostgreSQL, FTS5 on SQLite; left pending (retried next boot) if it fails
+    ("0007_client_search", install_client_search, None),
+    # Backfill of the per-day summary tables, maintained incrementally from then on
+    ("0008_day_aggregates", rebuild_day_aggregates, None),
+    # 0005/0006 were recorded without running on SQLite: apply them there too
+    ("0009_reservation_date_time_index_all", _ensure_date_time_index, None),
+    ("0010_reservation_slot_unique_sqlite", _ensure_slot_unique_sqlite, {"sqlite"}),
+    # Items are always loaded by reservation_id (IN lists, joins, cascading deletes)
+    ("0011_reservationitem_reservation_index", _add_reservationitem_reservation_index, None),
+]
+
+
+def _applied(conn: Connection) -> Set[str]:
+    return {row[0] for row in conn.execute(text(f"SELECT name FROM {SchemaMigration.__tablename__}"))}
+
+
+def _run_pending(conn: Connection) -> None:
+    backend = conn.dialect.name
+    applied = _applied(conn)
+    conn.commit()
+    for name, step, backends in MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            # One transaction per step: a failing step does not roll back the ones before it
+            with conn.begin():
+                if backends is None or backend in backends:
+                    step(conn)
+                conn.execute(
+                    text(f"INSERT INTO {SchemaMigration.__tablename__} (name, applied_at) VALUES (:name, :at)"),
+                    {"name": name, "at": datetime.utcnow()},
+                )
+            print(f"Migration {name} applied")
+        except Exception as e:
+            print(f"Migration {name} skipped due to error: {e}")
+
+
+def run_startup_migrations() -> None:
+    """Apply pending migration steps once; constant-time when the ledger is complete."""
+    names = {name for name, _, _ in MIGRATIONS}
+    with engine.connect() as conn:
+        if names <= _applied(conn):
+            return
+        conn.commit()
+        if conn.dialect.name != "postgresql":
+            _run_pending(conn)
+            return
+        # Blocks until the worker running the steps is done
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": PG_MIGRATION_LOCK_ID})
+        conn.commit()
+        try:
+            _run_pending(conn)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": PG_MIGRATION_LOCK_ID})
+            conn.commit()
@@ -2,7 +2,7 @@ from __future__ import annotations
 import uuid
 from datetime import date, time, datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlmodel import Field, SQLModel
 from sqlalchemy import UniqueConstraint, CheckConstraint, Index
@@ -48,7 +48,7 @@ class ReservationItemBase(SQLModel):
 
 class ReservationItem(ReservationItemBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    reservation_id: uuid.UUID | None = Field(default=None, foreign_key="reservation.id")
+    reservation_id: uuid.UUID | None = Field(default=None, foreign_key="reservation.id", index=True)
     type: str
     name: str
     quantity: int = 0
@@ -76,6 +76,8 @@ class Reservation(ReservationBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Zenchef booking id for imported groups (lets incremental syncs apply updates/cancellations)
+    zenchef_id: Optional[str] = Field(default=None, index=True)
     __table_args__ = (
         UniqueConstraint('service_date','arrival_time','client_name','pax', name='uq_reservation_slot'),
         CheckConstraint('pax >= 1', name='ck_reservation_pax_min'),
@@ -117,13 +119,116 @@ class ReservationRead(ReservationBase):
     items: List[ReservationItemRead] = Field(default_factory=list)
 
 
+class BulkOperation(str, Enum):
+    create = "create"
+    update = "update"
+    delete = "delete"
+
+
+# One entry of POST /api/reservations/bulk: `reservation` for create, `id` + `changes` for update, `id` for delete
+class ReservationBulkOp(SQLModel):
+    op: BulkOperation
+    id: Optional[uuid.UUID] = None
+    reservation: Optional[ReservationCreateIn] = None
+    changes: Optional[ReservationUpdate] = None
+
+
+class ReservationBulkResult(SQLModel):
+    index: int
+    op: BulkOperation
+    status: str  # created / updated / deleted / invalid
+    id: Optional[uuid.UUID] = None
+    reservation: Optional[ReservationRead] = None
+    error: Optional[str] = None
+
+
+# Per-day totals maintained alongside reservation writes (see aggregates.py)
+class DayItemTotal(SQLModel, table=True):
+    service_date: date = Field(primary_key=True)
+    type: str = Field(primary_key=True)
+    name: str = Field(primary_key=True)
+    quantity: int = 0
+
+
+class DaySlotTotal(SQLModel, table=True):
+    service_date: date = Field(primary_key=True)
+    slot: time = Field(primary_key=True)  # arrival time rounded down to SUMMARY_SLOT_MINUTES
+    reservations: int = 0
+    covers: int = 0
+
+
+class DaySummaryItem(SQLModel):
+    type: str
+    name: str
+    quantity: int
+
+
+class DaySummarySlot(SQLModel):
+    slot: time
+    reservations: int
+    covers: int
+
+
+class DaySummary(SQLModel):
+    service_date: date
+    reservations: int
+    covers: int
+    slot_minutes: int
+    by_type: Dict[str, int] = Field(default_factory=dict)
+    items: List[DaySummaryItem] = Field(default_factory=list)
+    slots: List[DaySummarySlot] = Field(default_factory=list)
+
+
 # Key/Value settings storage (e.g., Zenchef token and restaurant id)
 class Setting(SQLModel, table=True):
     key: str = Field(primary_key=True)
     value: str
 
 
+class ZenchefSettings(SQLModel):
+    api_token: Optional[str] = None
+    restaurant_id: Optional[str] = None
+
+
 # Store processed idempotency keys
 class ProcessedRequest(SQLModel, table=True):
     key: str = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # JSON response replayed to retries; NULL while the first request is still running
+    response: Optional[str] = None
+
+
+class SyncRun(SQLModel, table=True):
+    # One row per Zenchef sync run (manual or scheduled)
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    trigger: str = Field(default="manual")  # manual / schedule
+    status: str = Field(default="running")  # running / ok / failed / cancelled
+    started_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    pages: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+
+
+class PdfJobRecord(SQLModel, table=True):
+    # Background PDF job shared by every worker: any of them can answer the poll/download
+    __tablename__ = "pdfjob"
+    id: str = Field(primary_key=True)
+    kind: str
+    key: str
+    status: str = Field(default="queued")  # queued / running / done / failed
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: datetime = Field(index=True)
+    error: Optional[str] = None
+    content: Optional[bytes] = None
+
+
+class SchemaMigration(SQLModel, table=True):
+    # Ledger of applied startup migration steps (see migrations.py)
+    name: str = Field(primary_key=True)
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, update
+from sqlmodel import select
+
+from .database import session_context
+from .models import PdfJobRecord
+
+# Background PDF rendering: requests enqueue a job and poll/download it later,
+# so a burst of prints never holds the API's own threadpool while ReportLab runs.
+# Jobs render on the worker that received them; their state and PDF bytes are stored
+# in the pdfjob table so a poll landing on another worker (uvicorn --workers N) finds
+# them too. Results expire after PDF_JOB_TTL_SECONDS.
+PDF_JOB_WORKERS = int(os.getenv("PDF_JOB_WORKERS", "2"))
+PDF_JOB_QUEUE_MAX = int(os.getenv("PDF_JOB_QUEUE_MAX", "50"))
+PDF_JOB_TTL_SECONDS = int(os.getenv("PDF_JOB_TTL_SECONDS", "600"))
+
+
+class PdfJob:
+    def __init__(self, kind: str, key: str) -> None:
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.status = "queued"  # queued / running / done / failed
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.content: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self._expires = 0.0
+
+    @classmethod
+    def from_record(cls, row: PdfJobRecord) -> "PdfJob":
+        job = cls(row.kind, row.key)
+        job.id = row.id
+        job.status = row.status
+        job.created_at = row.created_at
+        job.started_at = row.started_at
+        job.finished_at = row.finished_at
+        job.content = row.content
+        job.error = row.error
+        return job
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+class PdfJobQueue:
+    """Bounded pool of render threads with an in-process job registry mirrored to the DB.
+
+    Identical queued jobs (same kind and key) are coalesced and the queue bound applies
+    per worker process; finished jobs and their PDF bytes are dropped after
+    PDF_JOB_TTL_SECONDS, in memory and in the pdfjob table.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, PdfJob] = {}
+
+    def _pending(self) -> List[PdfJob]:
+        return [j for j in self._jobs.values() if j.status in ("queued", "running")]
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job._expires and job._expires < now:
+                del self._jobs[job_id]
+
+    def submit(self, kind: str, key: str, render: Callable[[], bytes]) -> Optional[PdfJob]:
+        """Queue render(); returns the job, or None when the queue is full."""
+        with self._lock:
+            self._purge()
+            pending = self._pending()
+            for job in pending:
+                if job.kind == kind and job.key == key and job.status == "queued":
+                    return job
+            if len(pending) >= self.max_pending:
+                return None
+            job = PdfJob(kind, key)
+            self._jobs[job.id] = job
+        try:
+            with session_context() as session:
+                session.exec(delete(PdfJobRecord).where(PdfJobRecord.expires_at < job.created_at))
+                session.add(PdfJobRecord(
+                    id=job.id, kind=kind, key=key, status=job.status, created_at=job.created_at,
+                    expires_at=job.created_at + timedelta(seconds=PDF_JOB_TTL_SECONDS),
+                ))
+                session.commit()
+        except Exception as e:
+            print(f"PDF job {job.id} not shared with other workers: {e}")
+        self._executor.submit(self._run, job, render)
+        return job
+
+    def _save(self, job: PdfJob, **values) -> None:
+        values["expires_at"] = datetime.utcnow() + timedelta(seconds=PDF_JOB_TTL_SECONDS)
+        try:
+            with session_context() as session:
+                session.exec(update(PdfJobRecord).where(PdfJobRecord.id == job.id).values(**values))
+                session.commit()
+        except Exception as e:
+            print(f"PDF job {job.id} state not saved: {e}")
+
+    def _run(self, job: PdfJob, render: Callable[[], bytes]) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        self._save(job, status=job.status, started_at=job.started_at)
+        try:
+            job.content = render()
+            job.status = "done"
+        except Exception as e:
+            print(f"PDF job {job.id} ({job.kind} {job.key}) failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        self._save(job, status=job.status, finished_at=job.finished_at, content=job.content, error=job.error)
+        job._expires = time.monotonic() + PDF_JOB_TTL_SECONDS
+
+    def get(self, job_id: str) -> Optional[PdfJob]:
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        # Submitted to another worker
+        try:
+            with session_context() as session:
+                row = session.get(PdfJobRecord, job_id)
+                if row is None or row.expires_at < datetime.utcnow():
+                    return None
+                return PdfJob.from_record(row)
+        except Exception as e:
+            print(f"PDF job {job_id} lookup failed: {e}")
+            return None
+
+    def _shared_jobs(self) -> Optional[List[PdfJob]]:
+        # Every worker's live jobs, without their PDF bytes
+        columns = [c for c in PdfJobRecord.__table__.c if c.name not in ("content", "expires_at")]
+        try:
+            with session_context() as session:
+                rows = session.exec(
+                    select(*columns).where(PdfJobRecord.expires_at >= datetime.utcnow())
+                ).all()
+                return [PdfJob.from_record(PdfJobRecord(**row._mapping, expires_at=datetime.utcnow())) for row in rows]
+        except Exception as e:
+            print(f"PDF job stats from DB failed: {e}")
+            return None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._purge()
+            jobs = list(self._jobs.values())
+        shared = self._shared_jobs()
+        if shared is not None:
+            jobs = shared
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queued": sum(1 for j in jobs if j.status == "queued"),
+            "running": sum(1 for j in jobs if j.status == "running"),
+            "done": sum(1 for j in jobs if j.status == "done"),
+            "failed": sum(1 for j in jobs if j.status == "failed"),
+            "jobs": [j.to_dict() for j in sorted(jobs, key=lambda j: j.created_at, reverse=True)],
+        }
+
+
+pdf_jobs = PdfJobQueue(PDF_JOB_WORKERS, PDF_JOB_QUEUE_MAX)
@@ -1,30 +1,163 @@
+import hashlib
+import io
+import json
+import math
+import multiprocessing
 import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.platypus.flowables import HRFlowable
 
 from .models import Reservation, ReservationItem
 
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # parallel day rendering needs pypdf to merge the chunks
+    PdfReader = PdfWriter = None
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PDF_DIR = os.path.abspath(os.path.join(BASE_DIR, "../generated_pdfs"))
-os.makedirs(PDF_DIR, exist_ok=True)
+# PDFs are rendered in memory; PDF_PERSIST=1 also keeps a copy of each export in PDF_DIR
+PDF_PERSIST = os.getenv("PDF_PERSIST", "0") == "1"
 
 
-def _reservation_filename(reservation: Reservation) -> str:
+def _ensure_dir(path: str) -> bool:
+    # Read-only container filesystems: disk features are simply turned off
+    try:
+        os.makedirs(path, exist_ok=True)
+        return True
+    except OSError:
+        return False
+
+
+# Bump whenever the fiche layout changes so cached PDFs are not served with the old template
+PDF_TEMPLATE_VERSION = "1"
+PDF_CACHE_DIR = os.path.join(PDF_DIR, "cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+PDF_CACHE_ENABLED = PDF_CACHE_MAX_BYTES > 0 and _ensure_dir(PDF_CACHE_DIR)
+# One sub-directory per owner (a reservation id, production_<date>) holding its current render.
+# Sizes are tracked in memory, seeded by one scan per process; the directory is only rescanned
+# when that total goes over budget (which also picks up files written by other workers), and
+# eviction then goes down to PDF_CACHE_LOW_WATER of the budget so rescans stay rare.
+PDF_CACHE_LOW_WATER = 0.9
+_cache_lock = threading.Lock()
+_cache_index: "OrderedDict[str, int]" = OrderedDict()  # path -> size, least recently used first
+_cache_bytes = 0
+_cache_scanned = False
+
+# Day sheet rendering: PDF_DAY_WORKERS > 1 renders large days in a process pool
+PDF_DAY_WORKERS = int(os.getenv("PDF_DAY_WORKERS", "0"))
+PDF_DAY_CHUNK_SIZE = int(os.getenv("PDF_DAY_CHUNK_SIZE", "10"))
+_day_pool: Optional[ProcessPoolExecutor] = None
+_day_pool_workers = 0
+_day_pool_lock = threading.Lock()
+
+
+def reservation_pdf_name(reservation: Reservation) -> str:
     safe_client = str(reservation.client_name).replace(" ", "_")
-    return os.path.join(PDF_DIR, f"fiche_{reservation.service_date}_{safe_client}_{reservation.id}.pdf")
+    return f"fiche_{reservation.service_date}_{safe_client}_{reservation.id}.pdf"
+
+
+def _reservation_filename(reservation: Reservation) -> str:
+    return os.path.join(PDF_DIR, reservation_pdf_name(reservation))
 
 
 def _day_filename(d: date) -> str:
     return os.path.join(PDF_DIR, f"fiches_{d}.pdf")
 
 
+class _PdfTemplates:
+    """Styles, table styles, fonts and regexes shared by every render, built once per process."""
+
+    def __init__(self) -> None:
+        self.styles = getSampleStyleSheet()
+        self.styles.add(ParagraphStyle(name="Section", fontSize=12, leading=14, spaceBefore=6, spaceAfter=4, textColor=colors.HexColor("#111111")))
+        self.styles.add(ParagraphStyle(name="Meta", fontSize=10, leading=13))
+        self.styles.add(ParagraphStyle(name="TitleBar", parent=self.styles['Title'], textColor=colors.white, backColor=colors.HexColor('#111827'), leading=22, spaceAfter=6))
+        # Style des notes avec support du HTML
+        self.note_style = ParagraphStyle(
+            'NoteStyle',
+            parent=self.styles['Normal'],
+            leading=14,
+            spaceBefore=4,
+            spaceAfter=4
+        )
+
+        self.meta_table = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('TEXTCOLOR', (0,0), (0,-1), colors.HexColor('#374151')),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+        ])
+        self.section_table = TableStyle([
+            # Ligne d'en-tête colorée
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#111827')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('GRID', (0,0), (-1,-1), 0.25, colors.HexColor('#e5e7eb')),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('ALIGN', (0,1), (0,-1), 'CENTER'),
+            ('LEFTPADDING', (0,0), (-1,-1), 6),
+            ('RIGHTPADDING', (0,0), (-1,-1), 6),
+            ('TOPPADDING', (0,0), (-1,-1), 4),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+            # Alternance légère des lignes de données
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#f9fafb')]),
+        ])
+        self.drink_table = TableStyle([
+            ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#60a5fa')),
+            ('LEFTPADDING', (0,0), (-1,-1), 6),
+            ('RIGHTPADDING', (0,0), (-1,-1), 6),
+            ('TOPPADDING', (0,0), (-1,-1), 4),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+        ])
+        self.notes_table = TableStyle([
+            ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#60a5fa')),
+            ('INNERGRID', (0,0), (-1,-1), 0.25, colors.HexColor('#bfdbfe')),
+            ('LEFTPADDING', (0,0), (-1,-1), 10),
+            ('RIGHTPADDING', (0,0), (-1,-1), 10),
+            ('TOPPADDING', (0,0), (-1,-1), 8),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 8),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ])
+
+        # Gérer les couleurs [color=#RRGGBB]texte[/color]
+        self.color_re = re.compile(r'\[color=([^\]]+)\](.*?)\[/color\]')
+        # Marqueurs supprimés dans la version PDF simple (fiches du jour)
+        self.strip_re = re.compile(r'\[color=[^\]]+\]|\[/color\]|\*|_')
+
+        # Essayer de charger une police à largeur fixe pour les notes (une seule fois)
+        try:
+            pdfmetrics.registerFont(TTFont('Courier', 'Courier'))
+            self.notes_font = "Courier"
+        except Exception:
+            self.notes_font = "Helvetica"
+
+
+_templates: Optional[_PdfTemplates] = None
+_templates_lock = threading.Lock()
+
+
+def get_pdf_templates() -> _PdfTemplates:
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _PdfTemplates()
+    return _templates
+
+
 def _split_items(items: List[ReservationItem]):
     def norm(s: str) -> str:
         return s.lower().replace("é", "e")
@@ -34,14 +167,39 @@ def _split_items(items: List[ReservationItem]):
     return entrees, plats, desserts
 
 
-def generate_reservation_pdf(reservation: Reservation, items: List[ReservationItem]) -> str:
-    filename = _reservation_filename(reservation)
+def persist_pdf(filename: str, data: bytes) -> str:
+    """Atomically write data to filename (temp file + rename, so concurrent exports never interleave)."""
+    _ensure_dir(os.path.dirname(filename))
+    tmp = f"{filename}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return filename
+
+
+def keep_pdf_copy(name: str, data: bytes) -> None:
+    """Opt-in disk copy of an export (PDF_PERSIST=1); failures never break the download."""
+    if not PDF_PERSIST:
+        return
+    try:
+        persist_pdf(os.path.join(PDF_DIR, name), data)
+    except OSError as e:
+        print(f"PDF copy skipped: {e}")
+
 
-    doc = SimpleDocTemplate(filename, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name="Section", fontSize=12, leading=14, spaceBefore=6, spaceAfter=4, textColor=colors.HexColor("#111111")))
-    styles.add(ParagraphStyle(name="Meta", fontSize=10, leading=13))
-    styles.add(ParagraphStyle(name="TitleBar", parent=styles['Title'], textColor=colors.white, backColor=colors.HexColor('#111827'), leading=22, spaceAfter=6))
+def generate_reservation_pdf(reservation: Reservation, items: List[ReservationItem], filename: Optional[str] = None) -> str:
+    return persist_pdf(filename or _reservation_filename(reservation), render_reservation_pdf(reservation, items))
+
+
+def render_reservation_pdf(reservation: Reservation, items: List[ReservationItem]) -> bytes:
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    tpl = get_pdf_templates()
+    styles = tpl.styles
     story = []
 
     title = f"FICHE CUISINE – {reservation.service_date}"
@@ -56,11 +214,7 @@ def generate_reservation_pdf(reservation: Reservation, items: List[ReservationIt
         [Paragraph("Couverts", styles['Meta']), Paragraph(str(reservation.pax), styles['Meta'])],
     ]
     meta_tbl = Table(meta_data, colWidths=[110, None])
-    meta_tbl.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('TEXTCOLOR', (0,0), (0,-1), colors.HexColor('#374151')),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-    ]))
+    meta_tbl.setStyle(tpl.meta_table)
     story.append(meta_tbl)
     story.append(Spacer(1, 14))
 
@@ -76,20 +230,7 @@ def generate_reservation_pdf(reservation: Reservation, items: List[ReservationIt
             for it in collection:
                 data.append([str(it.quantity), it.name])
         tbl = Table(data, colWidths=[40, None])
-        tbl.setStyle(TableStyle([
-            # Ligne d'en-tête colorée
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#111827')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('GRID', (0,0), (-1,-1), 0.25, colors.HexColor('#e5e7eb')),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('ALIGN', (0,1), (0,-1), 'CENTER'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 4),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-            # Alternance légère des lignes de données
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#f9fafb')]),
-        ]))
+        tbl.setStyle(tpl.section_table)
         story.append(tbl)
         story.append(Spacer(1, 10))
 
@@ -99,13 +240,7 @@ def generate_reservation_pdf(reservation: Reservation, items: List[ReservationIt
 
     story.append(Paragraph("<b>Formule boissons :</b>", styles['Section']))
     fb_tbl = Table([[reservation.drink_formula or "-"]], colWidths=[None])
-    fb_tbl.setStyle(TableStyle([
-        ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#60a5fa')),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('RIGHTPADDING', (0,0), (-1,-1), 6),
-        ('TOPPADDING', (0,0), (-1,-1), 4),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-    ]))
+    fb_tbl.setStyle(tpl.drink_table)
     story.append(fb_tbl)
     story.append(Spacer(1, 10))
 
@@ -120,46 +255,224 @@ def generate_reservation_pdf(reservation: Reservation, items: List[ReservationIt
         text = text.replace('*', '<b>', 1).replace('*', '</b>', 1)  # Gras
         text = text.replace('_', '<i>', 1).replace('_', '</i>', 1)  # Italique
         # Gérer les couleurs [color=#RRGGBB]texte[/color]
-        import re
-        text = re.sub(r'\[color=([^\]]+)\](.*?)\[/color\]', r'<font color="\1">\2</font>', text)
+        text = tpl.color_re.sub(r'<font color="\1">\2</font>', text)
         # Gérer les listes à puces
         text = text.replace('\n- ', '<br/>• ')
         return text
     
-    # Créer un style pour les notes avec support du HTML
-    note_style = ParagraphStyle(
-        'NoteStyle',
-        parent=styles['Normal'],
-        leading=14,
-        spaceBefore=4,
-        spaceAfter=4
-    )
-    
     # Créer un paragraphe avec formatage HTML
     formatted_notes = format_text(notes)
-    note_para = Paragraph(formatted_notes, note_style)
+    note_para = Paragraph(formatted_notes, tpl.note_style)
     
     # Créer un tableau avec une seule cellule pour le paragraphe formaté
     note_tbl = Table([[note_para]], colWidths=[doc.width])
-    note_tbl.setStyle(TableStyle([
-        ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#60a5fa')),
-        ('INNERGRID', (0,0), (-1,-1), 0.25, colors.HexColor('#bfdbfe')),
-        ('LEFTPADDING', (0,0), (-1,-1), 10),
-        ('RIGHTPADDING', (0,0), (-1,-1), 10),
-        ('TOPPADDING', (0,0), (-1,-1), 8),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-    ]))
+    note_tbl.setStyle(tpl.notes_table)
     story.append(note_tbl)
 
     doc.build(story)
-    return filename
+    return buf.getvalue()
+
 
+def reservation_pdf_key(reservation: Reservation, items: List[ReservationItem]) -> str:
+    """Content hash of everything printed on a fiche, plus the template version."""
+    payload = {
+        "v": PDF_TEMPLATE_VERSION,
+        "reservation": {k: str(getattr(reservation, k)) for k in (
+            "id", "client_name", "pax", "service_date", "arrival_time", "drink_formula", "notes",
+        )},
+        "items": [[it.type, it.name, it.quantity] for it in items],
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
 
-def generate_day_pdf(d: date, reservations: List[Reservation], items_by_res: dict) -> str:
-    filename = _day_filename(d)
-    c = canvas.Canvas(filename, pagesize=A4)
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _scan_pdf_cache() -> None:
+    # Rebuild the index from disk in mtime order (touched on every hit); caller holds _cache_lock
+    global _cache_bytes, _cache_scanned
+    entries = []
+    for shard in os.scandir(PDF_CACHE_DIR):
+        if not shard.is_dir():
+            # Flat layout of older versions, never hit again
+            _remove_quietly(shard.path)
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.name.endswith(".pdf"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, entry.path, st.st_size))
+    _cache_index.clear()
+    for _, path, size in sorted(entries):
+        _cache_index[path] = size
+    _cache_bytes = sum(_cache_index.values())
+    _cache_scanned = True
+
+
+def _evict_pdf_cache() -> None:
+    # LRU until the cache is back under the low-water mark; caller holds _cache_lock
+    global _cache_bytes
+    _scan_pdf_cache()
+    target = int(PDF_CACHE_MAX_BYTES * PDF_CACHE_LOW_WATER)
+    while _cache_bytes > target and _cache_index:
+        path, size = _cache_index.popitem(last=False)
+        _remove_quietly(path)
+        _cache_bytes -= size
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+
+def _clear_shard(shard: str) -> None:
+    # Caller holds _cache_lock
+    global _cache_bytes
+    try:
+        names = os.listdir(shard)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(shard, name)
+        _remove_quietly(path)
+        _cache_bytes -= _cache_index.pop(path, 0)
+
+
+def _drop_cached(owner: str) -> None:
+    if not PDF_CACHE_ENABLED:
+        return
+    shard = os.path.join(PDF_CACHE_DIR, owner)
+    with _cache_lock:
+        _clear_shard(shard)
+        try:
+            os.rmdir(shard)
+        except OSError:
+            pass
+
+
+def _cached_pdf(owner: str, key: str, render: Callable[[], bytes]) -> bytes:
+    """Bytes stored for owner under key, rendered (replacing the owner's older render) on a miss."""
+    global _cache_bytes
+    if not PDF_CACHE_ENABLED:
+        return render()
+    shard = os.path.join(PDF_CACHE_DIR, owner)
+    path = os.path.join(shard, f"{key}.pdf")
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        os.utime(path)
+        with _cache_lock:
+            if path in _cache_index:
+                _cache_index.move_to_end(path)
+        return data
+    except FileNotFoundError:
+        pass
+    data = render()
+    try:
+        with _cache_lock:
+            if not _cache_scanned:
+                _scan_pdf_cache()
+            # Older renders of this owner can never be hit again
+            _clear_shard(shard)
+            persist_pdf(path, data)
+            _cache_index[path] = len(data)
+            _cache_bytes += len(data)
+            if _cache_bytes > PDF_CACHE_MAX_BYTES:
+                _evict_pdf_cache()
+    except OSError as e:
+        print(f"PDF cache write skipped: {e}")
+    return data
+
+
+def invalidate_reservation_pdf(reservation_id: uuid.UUID) -> None:
+    _drop_cached(str(reservation_id))
+
+
+def cached_reservation_pdf(reservation: Reservation, items: List[ReservationItem], key: Optional[str] = None) -> bytes:
+    """Bytes of the fiche, rendered only when no cached copy matches its content."""
+    key = key or reservation_pdf_key(reservation, items)
+    return _cached_pdf(str(reservation.id), key, lambda: render_reservation_pdf(reservation, items))
+
+
+def _render_day_chunk(payload: Tuple[list, dict]) -> bytes:
+    # Runs in a worker process: rebuild the models from plain dicts and draw them on a fresh canvas
+    res_dumps, items_dumps = payload
+    reservations = [Reservation.model_validate(r) for r in res_dumps]
+    items_by_res = {k: [ReservationItem.model_validate(it) for it in v] for k, v in items_dumps.items()}
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    _draw_day_pages(c, reservations, items_by_res)
+    c.save()
+    return buf.getvalue()
+
+
+def _get_day_pool(workers: int) -> ProcessPoolExecutor:
+    global _day_pool, _day_pool_workers
+    with _day_pool_lock:
+        if _day_pool is None or _day_pool_workers != workers:
+            if _day_pool is not None:
+                _day_pool.shutdown(wait=False)
+            # spawn: never fork a process that is running server threads
+            _day_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _day_pool_workers = workers
+        return _day_pool
+
+
+def generate_day_pdf(
+    d: date,
+    reservations: List[Reservation],
+    items_by_res: dict,
+    workers: Optional[int] = None,
+    filename: Optional[str] = None,
+) -> str:
+    return persist_pdf(filename or _day_filename(d), render_day_pdf(d, reservations, items_by_res, workers))
+
+
+def day_pdf_name(d: date) -> str:
+    return os.path.basename(_day_filename(d))
+
+
+def render_day_pdf(d: date, reservations: List[Reservation], items_by_res: dict, workers: Optional[int] = None) -> bytes:
+    """Render one page (or more for long notes) per reservation of the day.
+
+    With workers > 1 and more than PDF_DAY_CHUNK_SIZE reservations, the day is split into
+    chunks rendered in a process pool and the chunk PDFs are concatenated in order,
+    which yields the same pages as the single-process path.
+    """
+    workers = PDF_DAY_WORKERS if workers is None else workers
+    if workers > 1 and PdfWriter is not None and len(reservations) > PDF_DAY_CHUNK_SIZE:
+        chunk_size = max(PDF_DAY_CHUNK_SIZE, math.ceil(len(reservations) / workers))
+        payloads = []
+        for start in range(0, len(reservations), chunk_size):
+            chunk = reservations[start:start + chunk_size]
+            payloads.append((
+                [r.model_dump() for r in chunk],
+                {str(r.id): [it.model_dump() for it in items_by_res.get(str(r.id), [])] for r in chunk},
+            ))
+        parts = list(_get_day_pool(workers).map(_render_day_chunk, payloads))
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(PdfReader(io.BytesIO(part)))
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    _draw_day_pages(c, reservations, items_by_res)
+    c.save()
+    return buf.getvalue()
+
+
+def _draw_day_pages(c: canvas.Canvas, reservations: List[Reservation], items_by_res: dict) -> None:
     width, height = A4
+    tpl = get_pdf_templates()
 
     for idx, res in enumerate(reservations):
         if idx > 0:
@@ -216,23 +529,14 @@ def generate_day_pdf(d: date, reservations: List[Reservation], items_by_res: dic
                 c.drawString(x, y, "-")
                 return y - 14
                 
-            # Découper le texte en lignes tout en préservant le formatage
-            import re
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            
-            # Essayer de charger une police à largeur fixe
-            try:
-                pdfmetrics.registerFont(TTFont('Courier', 'Courier'))
-                c.setFont("Courier", 10)
-            except:
-                c.setFont("Helvetica", 10)
+            # Police des notes résolue une seule fois par processus (voir _PdfTemplates)
+            c.setFont(tpl.notes_font, 10)
             
             # Simplifier le formatage pour la version PDF simple
             lines = []
             for line in text.split('\n'):
                 # Supprimer les marqueurs de formatage pour la version simple
-                clean_line = re.sub(r'\[color=[^\]]+\]|\[/color\]|\*|_', '', line)
+                clean_line = tpl.strip_re.sub('', line)
                 if clean_line.startswith('- '):
                     clean_line = '• ' + clean_line[2:]
                 lines.append(clean_line)
@@ -253,5 +557,82 @@ def generate_day_pdf(d: date, reservations: List[Reservation], items_by_res: dic
         
         y = draw_formatted_text(res.notes, 50, y, width - 90)
 
-    c.save()
-    return filename
+
+def production_sheet_name(d: date) -> str:
+    return f"production_{d}.pdf"
+
+
+def production_sheet_key(data: Dict[str, Any]) -> str:
+    """Content hash of a production sheet: same totals, same PDF."""
+    payload = {
+        "v": PDF_TEMPLATE_VERSION,
+        "service_date": str(data["service_date"]),
+        "slot_minutes": data["slot_minutes"],
+        "items": data["items"],
+        "slots": [[str(s["slot"]), s["reservations"], s["covers"], s["items"]] for s in data["slots"]],
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def cached_production_sheet(data: Dict[str, Any], key: Optional[str] = None) -> bytes:
+    """Production sheet of a day, re-rendered only when its totals change."""
+    key = key or production_sheet_key(data)
+    return _cached_pdf(f"production_{data['service_date']}", key, lambda: render_production_sheet(data))
+
+
+def render_production_sheet(data: Dict[str, Any]) -> bytes:
+    """Consolidated dish totals of a day: per course for the whole service, then per arrival slot.
+
+    data comes from aggregates.production_sheet_data; a few pages whatever the number of groups.
+    """
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    tpl = get_pdf_templates()
+    styles = tpl.styles
+    story = []
+
+    story.append(Paragraph(f"FEUILLE DE PRODUCTION – {data['service_date']}", styles['TitleBar']))
+    story.append(Spacer(1, 6))
+    story.append(HRFlowable(width='100%', thickness=2, color=colors.HexColor('#60a5fa')))
+    story.append(Spacer(1, 10))
+
+    meta_tbl = Table([
+        [Paragraph("Groupes", styles['Meta']), Paragraph(str(data["reservations"]), styles['Meta'])],
+        [Paragraph("Couverts", styles['Meta']), Paragraph(str(data["covers"]), styles['Meta'])],
+    ], colWidths=[110, None])
+    meta_tbl.setStyle(tpl.meta_table)
+    story.append(meta_tbl)
+    story.append(Spacer(1, 14))
+
+    def as_items(rows) -> List[ReservationItem]:
+        return [ReservationItem(type=typ, name=name, quantity=qty) for typ, name, qty in rows]
+
+    def courses(rows, heading_style: str, skip_empty: bool = False):
+        entrees, plats, desserts = _split_items(as_items(rows))
+        for title, collection in (("Entrées", entrees), ("Plats", plats), ("Desserts", desserts)):
+            if skip_empty and not collection:
+                continue
+            total = sum(it.quantity for it in collection)
+            story.append(Paragraph(f"<b>{title} : {total}</b>", styles[heading_style]))
+            data_rows = [[Paragraph("Qté", styles['Meta']), Paragraph("", styles['Meta'])]]
+            data_rows += [[str(it.quantity), it.name] for it in collection] or [["-", "-"]]
+            tbl = Table(data_rows, colWidths=[40, None])
+            tbl.setStyle(tpl.section_table)
+            story.append(tbl)
+            story.append(Spacer(1, 8))
+
+    story.append(Paragraph("<b>Total du service</b>", styles['Heading2']))
+    courses(data["items"], 'Section')
+
+    minutes = data["slot_minutes"]
+    for slot in data["slots"]:
+        end = (slot["slot"].hour * 60 + slot["slot"].minute + minutes - 1) % (24 * 60)
+        story.append(Paragraph(
+            f"<b>{slot['slot'].strftime('%H:%M')}–{end // 60:02d}:{end % 60:02d}</b> · "
+            f"{slot['reservations']} groupe(s) · {slot['covers']} couverts",
+            styles['Heading2'],
+        ))
+        courses(slot["items"], 'Meta', skip_empty=True)
+
+    doc.build(story)
+    return buf.getvalue()
@@ -1,60 +1,214 @@
 from __future__ import annotations
+import base64
 import os
 import uuid
 import os
 from datetime import date, datetime, time as dtime, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-from sqlalchemy import delete
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import or_, and_
 
-from ..database import get_session
+from ..aggregates import apply_aggregates_async, day_summary, footprint, production_sheet_data
+from ..database import (
+    get_async_read_session,
+    get_async_session,
+    get_read_session,
+    read_session_context,
+    wrote_recently,
+)
 from ..models import (
+    BulkOperation,
+    DaySummary,
     Reservation,
     ReservationCreate,
     ReservationCreateIn,
     ReservationItem,
+    ReservationItemCreate,
+    ReservationBulkOp,
+    ReservationBulkResult,
     ReservationRead,
     ReservationUpdate,
 )
-from ..pdf_service import generate_reservation_pdf, generate_day_pdf
+from ..pdf_jobs import pdf_jobs
+from ..pdf_service import (
+    cached_production_sheet,
+    cached_reservation_pdf,
+    day_pdf_name,
+    invalidate_reservation_pdf,
+    keep_pdf_copy,
+    production_sheet_key,
+    production_sheet_name,
+    render_day_pdf,
+    reservation_pdf_key,
+    reservation_pdf_name,
+)
+from ..search_service import client_name_condition, search_client_names
 
 router = APIRouter(prefix="/api/reservations", tags=["reservations"])
 
 
+def _load_items(session: Session, reservation_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[ReservationItem]]:
+    """Fetch the items of several reservations in a single IN (...) query, grouped by reservation id."""
+    grouped: Dict[uuid.UUID, List[ReservationItem]] = {rid: [] for rid in reservation_ids}
+    if not reservation_ids:
+        return grouped
+    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id.in_(reservation_ids))).all()
+    for it in items:
+        grouped.setdefault(it.reservation_id, []).append(it)
+    return grouped
+
+
+def _to_read_models(session: Session, rows: List[Reservation]) -> List[ReservationRead]:
+    items_by_res = _load_items(session, [r.id for r in rows])
+    return [ReservationRead(**r.model_dump(), items=items_by_res.get(r.id, [])) for r in rows]
+
+
+MAX_PER_PAGE = 200
+
+
+def _encode_cursor(r: Reservation, direction: str = "next") -> str:
+    """Opaque keyset cursor on (service_date, arrival_time, id), tagged with the walk direction."""
+    raw = f"{direction}|{r.service_date.isoformat()}|{r.arrival_time.isoformat()}|{r.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, date, dtime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        direction, d_str, t_str, id_str = raw.split("|")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return direction, date.fromisoformat(d_str), dtime.fromisoformat(t_str), uuid.UUID(id_str)
+    except Exception:
+        raise HTTPException(422, "Invalid cursor")
+
+
+def _keyset_condition(c_date: date, c_time: dtime, c_id: uuid.UUID, after: bool):
+    if after:
+        return or_(
+            Reservation.service_date > c_date,
+            and_(Reservation.service_date == c_date, Reservation.arrival_time > c_time),
+            and_(Reservation.service_date == c_date, Reservation.arrival_time == c_time, Reservation.id > c_id),
+        )
+    return or_(
+        Reservation.service_date < c_date,
+        and_(Reservation.service_date == c_date, Reservation.arrival_time < c_time),
+        and_(Reservation.service_date == c_date, Reservation.arrival_time == c_time, Reservation.id < c_id),
+    )
+
+
+async def _paginate(
+    session: AsyncSession,
+    stmt,
+    response: Response,
+    ascending: bool,
+    page: int,
+    per_page: int,
+    cursor: Optional[str],
+) -> List[Reservation]:
+    """Page over (service_date, arrival_time, id) using ix_reservation_date_time.
+
+    With a cursor the page is located by a keyset predicate (constant cost at any depth);
+    without one the legacy page/per_page OFFSET is kept for backward compatibility.
+    Next/previous cursors are returned in the X-Next-Cursor / X-Prev-Cursor headers.
+    """
+    if per_page < 1:
+        per_page = 50
+    if per_page > MAX_PER_PAGE:
+        per_page = MAX_PER_PAGE
+    forward = True
+    has_before = False
+    if cursor:
+        direction, c_date, c_time, c_id = _decode_cursor(cursor)
+        forward = direction == "next"
+        has_before = forward
+        # Walking backwards flips both the comparison and the sort order
+        stmt = stmt.where(_keyset_condition(c_date, c_time, c_id, after=(ascending == forward)))
+    else:
+        if page < 1:
+            page = 1
+        has_before = page > 1
+        stmt = stmt.offset((page - 1) * per_page)
+    cols = (Reservation.service_date, Reservation.arrival_time, Reservation.id)
+    sort_asc = ascending == forward
+    stmt = stmt.order_by(*[c.asc() if sort_asc else c.desc() for c in cols]).limit(per_page + 1)
+
+    rows: List[Reservation] = list((await session.exec(stmt)).all())
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+    if rows:
+        if (has_more if forward else True):
+            response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1], "next")
+        if (has_before if forward else has_more):
+            response.headers["X-Prev-Cursor"] = _encode_cursor(rows[0], "prev")
+    return rows
+
+
 @router.get("", response_model=List[ReservationRead])
-def list_reservations(
+async def list_reservations(
+    response: Response,
     q: Optional[str] = None,
     service_date: Optional[date] = None,
-    session: Session = Depends(get_session),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 200,
+    session: AsyncSession = Depends(get_async_read_session),
 ):
-    stmt = select(Reservation).order_by(Reservation.service_date.desc(), Reservation.arrival_time.asc())
-    results = session.exec(stmt).all()
-    rows: List[Reservation] = results
-    if q:
-        rows = [r for r in rows if q.lower() in r.client_name.lower()]
+    # Filters and paging run in SQL; the next page cursor is returned in the X-Next-Cursor header
+    stmt = select(Reservation)
     if service_date:
-        rows = [r for r in rows if r.service_date == service_date]
-
-    # Attach items for read model
-    out: List[ReservationRead] = []
-    for r in rows:
-        items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == r.id)).all()
-        rr = ReservationRead(**r.model_dump(), items=items)
-        out.append(rr)
-    return out
+        stmt = stmt.where(Reservation.service_date == service_date)
+    if date_from:
+        stmt = stmt.where(Reservation.service_date >= date_from)
+    if date_to:
+        stmt = stmt.where(Reservation.service_date <= date_to)
+    if q:
+        stmt = stmt.where(await session.run_sync(client_name_condition, q))
+    if cursor:
+        _, c_date, c_time, c_id = _decode_cursor(cursor)
+        # Order is service_date DESC, arrival_time ASC, id ASC
+        stmt = stmt.where(or_(
+            Reservation.service_date < c_date,
+            and_(Reservation.service_date == c_date, Reservation.arrival_time > c_time),
+            and_(Reservation.service_date == c_date, Reservation.arrival_time == c_time, Reservation.id > c_id),
+        ))
+    if limit < 1:
+        limit = 200
+    if limit > 500:
+        limit = 500
+    stmt = stmt.order_by(
+        Reservation.service_date.desc(), Reservation.arrival_time.asc(), Reservation.id.asc()
+    ).limit(limit + 1)
+
+    rows: List[Reservation] = (await session.exec(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+
+    # Attach items for read model (one batched query for the whole list)
+    return await session.run_sync(_to_read_models, rows)
 
 
 @router.get("/upcoming", response_model=List[ReservationRead])
-def list_upcoming_reservations(
+async def list_upcoming_reservations(
+    response: Response,
     q: Optional[str] = None,
     page: int = 1,
     per_page: int = 50,
-    session: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     tz_name = os.getenv("TZ", "Europe/Paris")
     now_local = datetime.now(ZoneInfo(tz_name))
@@ -66,32 +220,21 @@ def list_upcoming_reservations(
         and_(Reservation.service_date == today, Reservation.arrival_time >= now_time),
     )
 
-    stmt = (
-        select(Reservation)
-        .where(condition)
-        .order_by(Reservation.service_date.asc(), Reservation.arrival_time.asc())
-    )
+    stmt = select(Reservation).where(condition)
     if q:
-        stmt = stmt.where(Reservation.client_name.ilike(f"%{q}%"))
-    if page < 1:
-        page = 1
-    if per_page < 1:
-        per_page = 50
-    stmt = stmt.offset((page - 1) * per_page).limit(per_page)
+        stmt = stmt.where(await session.run_sync(client_name_condition, q))
 
-    rows = session.exec(stmt).all()
-    out: List[ReservationRead] = []
-    for r in rows:
-        items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == r.id)).all()
-        out.append(ReservationRead(**r.model_dump(), items=items))
-    return out
+    rows = await _paginate(session, stmt, response, ascending=True, page=page, per_page=per_page, cursor=cursor)
+    return await session.run_sync(_to_read_models, rows)
 
 @router.get("/past", response_model=List[ReservationRead])
-def list_past_reservations(
+async def list_past_reservations(
+    response: Response,
     q: Optional[str] = None,
     page: int = 1,
     per_page: int = 50,
-    session: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     tz_name = os.getenv("TZ", "Europe/Paris")
     now_local = datetime.now(ZoneInfo(tz_name))
@@ -103,29 +246,83 @@ def list_past_reservations(
         and_(Reservation.service_date == today, Reservation.arrival_time < now_time),
     )
 
-    stmt = (
-        select(Reservation)
-        .where(condition)
-        .order_by(Reservation.service_date.desc(), Reservation.arrival_time.desc())
-    )
+    stmt = select(Reservation).where(condition)
     if q:
-        stmt = stmt.where(Reservation.client_name.ilike(f"%{q}%"))
-    if page < 1:
-        page = 1
-    if per_page < 1:
-        per_page = 50
-    stmt = stmt.offset((page - 1) * per_page).limit(per_page)
+        stmt = stmt.where(await session.run_sync(client_name_condition, q))
 
-    rows = session.exec(stmt).all()
-    out: List[ReservationRead] = []
-    for r in rows:
-        items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == r.id)).all()
-        out.append(ReservationRead(**r.model_dump(), items=items))
-    return out
+    rows = await _paginate(session, stmt, response, ascending=False, page=page, per_page=per_page, cursor=cursor)
+    return await session.run_sync(_to_read_models, rows)
 
 
-@router.post("", response_model=ReservationRead)
-def create_reservation(payload: ReservationCreateIn, session: Session = Depends(get_session)):
+@router.get("/search", response_model=List[ReservationRead])
+async def search_reservations(q: str, limit: int = 20, session: AsyncSession = Depends(get_async_read_session)):
+    # Ranked, accent-insensitive client-name search backed by pg_trgm / FTS5
+    if limit < 1:
+        limit = 20
+    if limit > MAX_PER_PAGE:
+        limit = MAX_PER_PAGE
+    if not q.strip():
+        return []
+    rows = await session.run_sync(search_client_names, q, limit)
+    return await session.run_sync(_to_read_models, rows)
+
+
+def _check_item_totals(pax: int, items: List[ReservationItemCreate]) -> None:
+    """Server-side guard: per-type totals must not exceed pax (422 otherwise)."""
+    try:
+        totals = { 'entrée': 0, 'plat': 0, 'dessert': 0 }
+        for it in items:
+            if it.type in totals:
+                totals[it.type] += int(it.quantity or 0)
+        offenders = [
+            f"{k}={v}" for k, v in totals.items() if v > pax
+        ]
+        if offenders:
+            raise HTTPException(422, f"Le total par type dépasse le nombre de couverts ({pax}): " + ", ".join(offenders))
+    except AttributeError:
+        pass
+
+
+def _clean_items(items: List[ReservationItemCreate]) -> List[tuple[str, str, int]]:
+    # sanitize items: blank names and non-positive quantities are dropped
+    cleaned = []
+    for it in items:
+        nm = (it.name or "").strip()
+        qty = int(it.quantity or 0)
+        if not nm or qty <= 0:
+            continue
+        cleaned.append((it.type, nm, qty))
+    return cleaned
+
+
+def _diff_items(
+    reservation_id: uuid.UUID, existing: List[ReservationItem], incoming: List[tuple[str, str, int]],
+) -> tuple[List[ReservationItem], List[ReservationItem], List[uuid.UUID]]:
+    """Match incoming (type, name, quantity) rows to stored items on (type, name).
+
+    Matched items keep their id and only get their quantity updated when it differs.
+    Returns (items after the update, in incoming order; new items to insert; ids to delete).
+    """
+    stored: Dict[tuple[str, str], List[ReservationItem]] = {}
+    for it in existing:
+        stored.setdefault((it.type, it.name), []).append(it)
+    items, added = [], []
+    for typ, nm, qty in incoming:
+        matches = stored.get((typ, nm))
+        if matches:
+            it = matches.pop(0)
+            if it.quantity != qty:
+                it.quantity = qty
+        else:
+            it = ReservationItem(type=typ, name=nm, quantity=qty, reservation_id=reservation_id)
+            added.append(it)
+        items.append(it)
+    removed = [it.id for left in stored.values() for it in left]
+    return items, added, removed
+
+
+def _normalize_create(payload: ReservationCreateIn) -> dict:
+    """Reservation fields of a create payload, parsed and sanitized; raises 422 on invalid input."""
     # Accept strings for date/time and normalize for safety
     data = payload.model_dump(exclude={"items"})
     raw_service_date = data.get("service_date")
@@ -181,54 +378,179 @@ def create_reservation(payload: ReservationCreateIn, session: Session = Depends(
         "pax": pax,
     })
 
-    # Server-side guard: per-type totals must not exceed pax
-    try:
-        totals = { 'entrée': 0, 'plat': 0, 'dessert': 0 }
-        for it in payload.items:
-            if it.type in totals:
-                totals[it.type] += int(it.quantity or 0)
-        offenders = [
-            f"{k}={v}" for k, v in totals.items() if v > pax
-        ]
-        if offenders:
-            raise HTTPException(422, f"Le total par type dépasse le nombre de couverts ({pax}): " + ", ".join(offenders))
-    except AttributeError:
-        pass
+    _check_item_totals(pax, payload.items)
+    return data
+
 
+@router.post("", response_model=ReservationRead)
+async def create_reservation(payload: ReservationCreateIn, session: AsyncSession = Depends(get_async_session)):
+    data = _normalize_create(payload)
+    # Ids and timestamps are set client-side: the row, its items and the day totals go out
+    # in one flush and one commit, and the response is built from these objects
     res = Reservation(**data)
+    items = [ReservationItem(type=typ, name=nm, quantity=qty, reservation_id=res.id) for typ, nm, qty in _clean_items(payload.items)]
     session.add(res)
-    session.commit()
-    session.refresh(res)
+    session.add_all(items)
+    await apply_aggregates_async(session, [], [footprint(res, items)])
+    await session.commit()
+    return ReservationRead(**res.model_dump(), items=items)
 
-    for it in payload.items:
-        # sanitize items
-        nm = (it.name or "").strip()
-        qty = int(it.quantity or 0)
-        if not nm or qty <= 0:
-            continue
-        rit = ReservationItem(type=it.type, name=nm, quantity=qty, reservation_id=res.id)
-        session.add(rit)
-    session.commit()
 
-    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
-    return ReservationRead(**res.model_dump(), items=items)
+MAX_BULK_OPS = 500
+
+
+@router.post("/bulk", response_model=List[ReservationBulkResult])
+async def bulk_reservations(ops: List[ReservationBulkOp], session: AsyncSession = Depends(get_async_session)):
+    """Apply many create/update/delete operations in a single transaction, all or nothing.
+
+    Every operation goes through the same normalization and pax/items guard as the
+    single-row endpoints; if any is rejected nothing is written and the 422 lists the
+    result of each row.
+    """
+    if len(ops) > MAX_BULK_OPS:
+        raise HTTPException(413, f"Au plus {MAX_BULK_OPS} opérations par requête")
+    if not ops:
+        return []
+
+    # Targets of updates/deletes and their items: two queries for the whole batch
+    target_ids = list({op.id for op in ops if op.op != BulkOperation.create and op.id is not None})
+    existing: Dict[uuid.UUID, Reservation] = {}
+    if target_ids:
+        # Locked (in id order, so concurrent batches cannot deadlock) until the commit
+        existing = {r.id: r for r in (await session.exec(
+            select(Reservation).where(Reservation.id.in_(target_ids)).order_by(Reservation.id).with_for_update()
+        )).all()}
+    items_by_res = await session.run_sync(_load_items, list(existing))
+
+    results: List[ReservationBulkResult] = []
+    plans = []
+    seen = set()
+    for index, op in enumerate(ops):
+        result = ReservationBulkResult(index=index, op=op.op, status="valid", id=op.id)
+        results.append(result)
+        try:
+            if op.op == BulkOperation.create:
+                if op.reservation is None:
+                    raise HTTPException(422, "Champ 'reservation' requis pour une création")
+                plans.append((op, _normalize_create(op.reservation), _clean_items(op.reservation.items)))
+                continue
+            res = existing.get(op.id) if op.id is not None else None
+            if res is None:
+                raise HTTPException(404, "Reservation not found")
+            if res.id in seen:
+                raise HTTPException(422, "Réservation présente plusieurs fois dans le lot")
+            seen.add(res.id)
+            if op.op == BulkOperation.delete:
+                plans.append((op, res, None))
+                continue
+            if op.changes is None:
+                raise HTTPException(422, "Champ 'changes' requis pour une modification")
+            update_data = _normalize_update(res, op.changes)
+            check_items = op.changes.items if op.changes.items is not None else items_by_res[res.id]
+            _check_item_totals(update_data.get("pax", res.pax), check_items)
+            new_items = None if op.changes.items is None else _clean_items(op.changes.items)
+            plans.append((op, (res, update_data), new_items))
+        except HTTPException as e:
+            result.status = "invalid"
+            result.error = str(e.detail)
+    if any(r.status == "invalid" for r in results):
+        for r in results:
+            if r.status == "valid":
+                r.status = "skipped"
+        return JSONResponse(status_code=422, content={
+            "detail": "Lot refusé : aucune opération n'a été appliquée",
+            "results": [r.model_dump(mode="json") for r in results],
+        })
+
+    deleted_ids = [target.id for op, target, _ in plans if op.op == BulkOperation.delete]
+    try:
+        # Deletes go first (before any update is flushed), so a batch can reuse a freed slot
+        if deleted_ids:
+            await session.exec(delete(ReservationItem).where(ReservationItem.reservation_id.in_(deleted_ids)))
+            await session.exec(delete(Reservation).where(Reservation.id.in_(deleted_ids)))
+    except IntegrityError as e:
+        await session.rollback()
+        print(f"Bulk reservations rejected: {e.orig}")
+        raise HTTPException(409, "Conflit lors de la suppression des réservations du lot")
+
+    now = datetime.utcnow()
+    before, after = [], []
+    new_reservations: List[Reservation] = []
+    new_items: List[ReservationItem] = []
+    items_after: Dict[uuid.UUID, List[ReservationItem]] = {}
+    touched_ids, removed_item_ids = [], []
+    for (op, target, items), result in zip(plans, results):
+        if op.op == BulkOperation.create:
+            res = Reservation(**target)
+            created = [ReservationItem(type=t, name=n, quantity=q, reservation_id=res.id) for t, n, q in items]
+            new_reservations.append(res)
+            new_items.extend(created)
+            items_after[res.id] = created
+            after.append(footprint(res, created))
+            result.id = res.id
+        elif op.op == BulkOperation.delete:
+            before.append(footprint(target, items_by_res[target.id]))
+        else:
+            res, update_data = target
+            old_items = items_by_res[res.id]
+            moves_items = items is not None or update_data.get("service_date", res.service_date) != res.service_date
+            before.append(footprint(res, old_items if moves_items else None))
+            for k, v in update_data.items():
+                setattr(res, k, v)
+            res.updated_at = now
+            if items is not None:
+                items_after[res.id], added, removed = _diff_items(res.id, old_items, items)
+                new_items.extend(added)
+                removed_item_ids.extend(removed)
+            else:
+                items_after[res.id] = old_items
+            after.append(footprint(res, items_after[res.id] if moves_items else None))
+            touched_ids.append(res.id)
+
+    try:
+        if removed_item_ids:
+            await session.exec(delete(ReservationItem).where(ReservationItem.id.in_(removed_item_ids)))
+        # Updates before inserts: a batch may move a reservation out of a slot that a create then takes
+        await session.flush()
+        if new_reservations:
+            await session.exec(insert(Reservation), params=[r.model_dump() for r in new_reservations])
+        if new_items:
+            await session.exec(insert(ReservationItem), params=[it.model_dump() for it in new_items])
+        await apply_aggregates_async(session, before, after)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        print(f"Bulk reservations rejected: {e.orig}")
+        raise HTTPException(409, "Conflit : un créneau (date, heure, client, couverts) est déjà réservé")
+
+    def invalidate() -> None:
+        for rid in deleted_ids + touched_ids:
+            invalidate_reservation_pdf(rid)
+    await run_in_threadpool(invalidate)
+
+    by_id = {r.id: r for r in new_reservations}
+    by_id.update({rid: existing[rid] for rid in touched_ids})
+    for (op, _, _), result in zip(plans, results):
+        if op.op == BulkOperation.delete:
+            result.status = "deleted"
+            continue
+        res = by_id[result.id]
+        result.status = "created" if op.op == BulkOperation.create else "updated"
+        result.reservation = ReservationRead(**res.model_dump(), items=items_after[res.id])
+    return results
 
 
 @router.get("/{reservation_id}", response_model=ReservationRead)
-def get_reservation(reservation_id: uuid.UUID, session: Session = Depends(get_session)):
-    res = session.get(Reservation, reservation_id)
+async def get_reservation(reservation_id: uuid.UUID, session: AsyncSession = Depends(get_async_session)):
+    res = await session.get(Reservation, reservation_id)
     if not res:
         raise HTTPException(404, "Reservation not found")
-    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
+    items = (await session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id))).all()
     return ReservationRead(**res.model_dump(), items=items)
 
 
-@router.put("/{reservation_id}", response_model=ReservationRead)
-def update_reservation(reservation_id: uuid.UUID, payload: ReservationUpdate, session: Session = Depends(get_session)):
-    res = session.get(Reservation, reservation_id)
-    if not res:
-        raise HTTPException(404, "Reservation not found")
-
+def _normalize_update(res: Reservation, payload: ReservationUpdate) -> dict:
+    """Fields set in an update payload, parsed and sanitized (unparseable date/time are ignored)."""
     update_data = payload.model_dump(exclude_unset=True, exclude={"items"})
     # Normalize string date/time to proper types
     if isinstance(update_data.get("service_date"), str):
@@ -257,109 +579,182 @@ def update_reservation(reservation_id: uuid.UUID, payload: ReservationUpdate, se
         update_data["notes"] = (str(update_data["notes"]) or "").strip()
         if len(update_data["notes"]) > 4000:
             update_data["notes"] = update_data["notes"][:4000]
-    if "pax" in update_data and update_data["pax"] is not None:
+    # pax is NOT NULL: an explicit null leaves it unchanged, like an omitted field
+    if "pax" in update_data and update_data["pax"] is None:
+        del update_data["pax"]
+    if "pax" in update_data:
         p = int(update_data["pax"])
         if p < 1:
             p = 1
         if p > 500:
             p = 500
         update_data["pax"] = p
+    return update_data
+
+
+@router.put("/{reservation_id}", response_model=ReservationRead)
+async def update_reservation(reservation_id: uuid.UUID, payload: ReservationUpdate, session: AsyncSession = Depends(get_async_session)):
+    # Row lock: a concurrent write to this reservation waits, so its footprint is never stale
+    res = await session.get(Reservation, reservation_id, with_for_update=True)
+    if not res:
+        raise HTTPException(404, "Reservation not found")
+
+    update_data = _normalize_update(res, payload)
+
+    # One select of the stored items serves the guard, the item diff and the response
+    existing_items = (await session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id))).all()
+    # Server-side guard: per-type totals must not exceed pax. Stored items were checked
+    # when written, so without new items only a lower pax needs a check. _normalize_update
+    # drops an explicit null pax, so check_pax is always an int here.
+    check_pax = update_data.get('pax', res.pax)
+    if payload.items is not None:
+        _check_item_totals(check_pax, payload.items)
+    elif check_pax < res.pax:
+        _check_item_totals(check_pax, existing_items)
+
+    # Items only move in the day aggregates when they change or the day changes
+    moves_items = payload.items is not None or update_data.get("service_date", res.service_date) != res.service_date
+    before = footprint(res, existing_items if moves_items else None)
 
     for k, v in update_data.items():
         setattr(res, k, v)
     # touch updated_at
-    try:
-        setattr(res, 'updated_at', datetime.utcnow())
-    except Exception:
-        pass
-    # Server-side guard: per-type totals must not exceed pax (using incoming items or existing ones)
-    try:
-        check_pax = update_data.get('pax', res.pax)
-        totals = { 'entrée': 0, 'plat': 0, 'dessert': 0 }
-        if payload.items is not None:
-            for it in payload.items:
-                if it.type in totals:
-                    totals[it.type] += int(it.quantity or 0)
-        else:
-            existing_items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
-            for it in existing_items:
-                if it.type in totals:
-                    totals[it.type] += int(it.quantity or 0)
-        offenders = [
-            f"{k}={v}" for k, v in totals.items() if v > (check_pax or 0)
-        ]
-        if offenders:
-            raise HTTPException(422, f"Le total par type dépasse le nombre de couverts ({check_pax}): " + ", ".join(offenders))
-    except Exception:
-        # if any unexpected error during guard, fail safe to proceed
-        pass
-
-    # Atomic update with items replacement (stay on the same session)
+    res.updated_at = datetime.utcnow()
     session.add(res)
-    if payload.items is not None:
-        session.exec(delete(ReservationItem).where(ReservationItem.reservation_id == res.id))
-        for it in payload.items:
-            nm = (it.name or "").strip()
-            qty = int(it.quantity or 0)
-            if not nm or qty <= 0:
-                continue
-            session.add(ReservationItem(type=it.type, name=nm, quantity=qty, reservation_id=res.id))
-    session.commit()
 
-    session.refresh(res)
-    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
+    items = existing_items
+    if payload.items is not None:
+        items, added, removed = _diff_items(res.id, existing_items, _clean_items(payload.items))
+        session.add_all(added)
+        if removed:
+            await session.exec(delete(ReservationItem).where(ReservationItem.id.in_(removed)))
+    await apply_aggregates_async(session, [before], [footprint(res, items if moves_items else None)])
+    await session.commit()
+    await run_in_threadpool(invalidate_reservation_pdf, res.id)
     return ReservationRead(**res.model_dump(), items=items)
 
 
 @router.delete("/{reservation_id}")
-def delete_reservation(reservation_id: uuid.UUID, session: Session = Depends(get_session)):
-    res = session.get(Reservation, reservation_id)
+async def delete_reservation(reservation_id: uuid.UUID, session: AsyncSession = Depends(get_async_session)):
+    # Row lock: a concurrent delete waits for this one, then finds no row (404) instead of
+    # subtracting the reservation from the day totals a second time
+    res = await session.get(Reservation, reservation_id, with_for_update=True)
     if not res:
         raise HTTPException(404, "Reservation not found")
-    session.delete(res)
-    session.exec(delete(ReservationItem).where(ReservationItem.reservation_id == res.id))
-    session.commit()
+    items = (await session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id))).all()
+    await apply_aggregates_async(session, [footprint(res, items)], [])
+    await session.delete(res)
+    await session.exec(delete(ReservationItem).where(ReservationItem.reservation_id == res.id))
+    await session.commit()
+    await run_in_threadpool(invalidate_reservation_pdf, reservation_id)
     return {"ok": True}
 
 
 @router.post("/{reservation_id}/duplicate", response_model=ReservationRead)
-def duplicate_reservation(reservation_id: uuid.UUID, session: Session = Depends(get_session)):
-    res = session.get(Reservation, reservation_id)
+async def duplicate_reservation(reservation_id: uuid.UUID, session: AsyncSession = Depends(get_async_session)):
+    res = await session.get(Reservation, reservation_id)
     if not res:
         raise HTTPException(404, "Reservation not found")
-    items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
+    items = (await session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id))).all()
 
     new_res = Reservation(**{k: getattr(res, k) for k in [
         'client_name','pax','service_date','arrival_time','drink_formula','notes','status'
     ]})
+    new_items = [ReservationItem(type=it.type, name=it.name, quantity=it.quantity, reservation_id=new_res.id) for it in items]
+    # Same single-flush path as create_reservation
     session.add(new_res)
-    session.commit()
-    session.refresh(new_res)
+    session.add_all(new_items)
+    await apply_aggregates_async(session, [], [footprint(new_res, new_items)])
+    await session.commit()
+    return ReservationRead(**new_res.model_dump(), items=new_items)
 
-    for it in items:
-        session.add(ReservationItem(type=it.type, name=it.name, quantity=it.quantity, reservation_id=new_res.id))
-    session.commit()
 
-    new_items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == new_res.id)).all()
-    return ReservationRead(**new_res.model_dump(), items=new_items)
+def _pdf_response(data: bytes, filename: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    # PDFs are rendered in memory and sent as-is: no temp file to write and read back
+    disposition = f"attachment; filename*=utf-8''{quote(filename)}" if not filename.isascii() else f'attachment; filename="{filename}"'
+    return Response(content=data, media_type="application/pdf", headers={**(headers or {}), "Content-Disposition": disposition})
 
 
 @router.get("/{reservation_id}/pdf")
-def export_reservation_pdf(reservation_id: uuid.UUID, session: Session = Depends(get_session)):
+def export_reservation_pdf(reservation_id: uuid.UUID, request: Request, session: Session = Depends(get_read_session)):
     res = session.get(Reservation, reservation_id)
     if not res:
         raise HTTPException(404, "Reservation not found")
     items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == res.id)).all()
-    path = generate_reservation_pdf(res, items)
-    return FileResponse(path, filename=os.path.basename(path), media_type="application/pdf")
+    # Content-addressed cache: the ETag is the hash of the printed data, so reprints are served as-is
+    key = reservation_pdf_key(res, items)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("If-None-Match") or ""
+    if key in [tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    data = cached_reservation_pdf(res, items, key)
+    keep_pdf_copy(reservation_pdf_name(res), data)
+    return _pdf_response(data, reservation_pdf_name(res), headers)
+
+
+def _load_day(session: Session, d: date) -> tuple[List[Reservation], dict]:
+    rows = session.exec(select(Reservation).where(Reservation.service_date == d).order_by(Reservation.arrival_time.asc())).all()
+    items_by_res = {str(rid): items for rid, items in _load_items(session, [r.id for r in rows]).items()}
+    return rows, items_by_res
+
+
+@router.get("/day/{d}/summary", response_model=DaySummary)
+async def get_day_summary(d: date, session: AsyncSession = Depends(get_async_read_session)):
+    # Served from the per-day aggregate tables: no scan of the day's reservations or items
+    return await day_summary(session, d)
 
 
 @router.get("/day/{d}/pdf")
-def export_day_pdf(d: date, session: Session = Depends(get_session)):
-    rows = session.exec(select(Reservation).where(Reservation.service_date == d).order_by(Reservation.arrival_time.asc())).all()
-    items_by_res = {}
-    for r in rows:
-        items = session.exec(select(ReservationItem).where(ReservationItem.reservation_id == r.id)).all()
-        items_by_res[str(r.id)] = items
-    path = generate_day_pdf(d, rows, items_by_res)
-    return FileResponse(path, filename=os.path.basename(path), media_type="application/pdf")
+def export_day_pdf(d: date, session: Session = Depends(get_read_session)):
+    rows, items_by_res = _load_day(session, d)
+    data = render_day_pdf(d, rows, items_by_res)
+    keep_pdf_copy(day_pdf_name(d), data)
+    return _pdf_response(data, day_pdf_name(d))
+
+
+@router.get("/day/{d}/production/pdf")
+def export_production_sheet(d: date, request: Request, session: Session = Depends(get_read_session)):
+    # Consolidated dish totals for the kitchen; cached until the day's totals change
+    data = production_sheet_data(session, d)
+    key = production_sheet_key(data)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("If-None-Match") or ""
+    if key in [tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    pdf = cached_production_sheet(data, key)
+    keep_pdf_copy(production_sheet_name(d), pdf)
+    return _pdf_response(pdf, production_sheet_name(d), headers)
+
+
+@router.get("/pdf/jobs")
+def pdf_jobs_status():
+    # Queue depth and state of background PDF jobs
+    return pdf_jobs.stats()
+
+
+@router.post("/day/{d}/pdf/jobs", status_code=202)
+def create_day_pdf_job(d: date, request: Request):
+    primary = wrote_recently(request)
+
+    def render() -> bytes:
+        # Runs on a PDF worker thread with its own session
+        with read_session_context(primary) as session:
+            rows, items_by_res = _load_day(session, d)
+        return render_day_pdf(d, rows, items_by_res)
+
+    job = pdf_jobs.submit("day", d.isoformat(), render)
+    if job is None:
+        raise HTTPException(503, "Trop d'impressions en attente, veuillez réessayer dans un instant")
+    return job.to_dict()
+
+
+@router.get("/day/{d}/pdf/jobs/{job_id}")
+def get_day_pdf_job(d: date, job_id: str):
+    job = pdf_jobs.get(job_id)
+    if not job or job.kind != "day" or job.key != d.isoformat():
+        raise HTTPException(404, "Job not found")
+    if job.status == "done":
+        return _pdf_response(job.content, day_pdf_name(d))
+    if job.status == "failed":
+        raise HTTPException(500, f"PDF generation failed: {job.error}")
+    return JSONResponse(status_code=202, content=job.to_dict())
@@ -0,0 +1,287 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from .models import MenuItem, MenuItemRead, Reservation
+
+# Accent-insensitive client-name search.
+# - List filters (q on /, /upcoming, /past) are substring matches on every backend:
+#   f_unaccent(lower(client_name)) LIKE on PostgreSQL (pg_trgm GIN index), and on SQLite
+#   fold(client_name) LIKE, fold() being registered on each connection (database.py).
+# - Ranked /search: substring LIKE ordered by word_similarity on PostgreSQL; on SQLite an
+#   FTS5 table (unicode61, diacritics removed) kept in sync by triggers, word-prefix MATCH
+#   ranked by bm25 ("dup" finds "Dupont", "upon" does not).
+# When the PostgreSQL index could not be installed, filters fall back to a plain ILIKE.
+
+PG_TRGM_INDEX = "ix_reservation_client_name_trgm"
+SQLITE_FTS_TABLE = "reservation_fts"
+
+_ready: Dict[str, bool] = {}
+
+
+def fold(s: str) -> str:
+    """Lowercase and strip every diacritic ("Élodie" -> "elodie", "crème" -> "creme")."""
+    decomposed = unicodedata.normalize("NFKD", s or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def install_client_search(conn) -> None:
+    """Create the search index for the connection's backend (idempotent)."""
+    backend = conn.dialect.name
+    if backend == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        # unaccent() is only STABLE; an IMMUTABLE wrapper is required to index on it
+        conn.execute(text(
+            """
+            CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+              LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+              AS $$ SELECT public.unaccent('public.unaccent', $1) $$;
+            """
+        ))
+        conn.execute(text(
+            f"""
+            CREATE INDEX IF NOT EXISTS {PG_TRGM_INDEX}
+              ON reservation USING gin (f_unaccent(lower(client_name)) gin_trgm_ops);
+            """
+        ))
+    elif backend == "sqlite":
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": SQLITE_FTS_TABLE}).first()
+        if exists:
+            return
+        # Own-content table keyed on the reservation UUID (rowids of a non-INTEGER PK table are not stable)
+        conn.execute(text(
+            f"""
+            CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(
+              id UNINDEXED, client_name, tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        ))
+        conn.execute(text(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS reservation_fts_ai AFTER INSERT ON reservation BEGIN
+              INSERT INTO {SQLITE_FTS_TABLE}(id, client_name) VALUES (new.id, new.client_name);
+            END
+            """
+        ))
+        conn.execute(text(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS reservation_fts_ad AFTER DELETE ON reservation BEGIN
+              DELETE FROM {SQLITE_FTS_TABLE} WHERE id = old.id;
+            END
+            """
+        ))
+        conn.execute(text(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS reservation_fts_au AFTER UPDATE OF client_name ON reservation BEGIN
+              UPDATE {SQLITE_FTS_TABLE} SET client_name = new.client_name WHERE id = old.id;
+            END
+            """
+        ))
+        # Index rows that existed before the FTS table
+        conn.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}(id, client_name) SELECT id, client_name FROM reservation"))
+    _ready[backend] = True
+
+
+def _is_ready(session: Session) -> bool:
+    backend = session.get_bind().dialect.name
+    if backend not in _ready:
+        if backend == "postgresql":
+            sql = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+            name = PG_TRGM_INDEX
+        elif backend == "sqlite":
+            sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            name = SQLITE_FTS_TABLE
+        else:
+            _ready[backend] = False
+            return False
+        try:
+            _ready[backend] = session.exec(text(sql).bindparams(name=name)).first() is not None
+        except Exception:
+            _ready[backend] = False
+    return _ready[backend]
+
+
+def _like_pattern(q: str) -> str:
+    escaped = fold(q).strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_query(q: str) -> str:
+    # Every word must match as a prefix: "dup elo" -> "dup"* "elo"*
+    tokens = re.findall(r"\w+", fold(q))
+    return " ".join(f'"{tok}"*' for tok in tokens)
+
+
+def client_name_condition(session: Session, q: str):
+    """WHERE clause matching q anywhere in client names, ignoring case and accents."""
+    backend = session.get_bind().dialect.name
+    if backend == "sqlite":
+        return func.fold(Reservation.client_name).like(_like_pattern(q), escape="\\")
+    if backend == "postgresql" and _is_ready(session):
+        return func.f_unaccent(func.lower(Reservation.client_name)).like(_like_pattern(q), escape="\\")
+    return Reservation.client_name.ilike(f"%{q}%")
+
+
+def search_client_names(session: Session, q: str, limit: int = 20) -> List[Reservation]:
+    """Reservations whose client name matches q, best matches first."""
+    if not _is_ready(session):
+        stmt = select(Reservation).where(client_name_condition(session, q))
+        return list(session.exec(stmt.order_by(Reservation.service_date.desc()).limit(limit)).all())
+
+    if session.get_bind().dialect.name == "postgresql":
+        folded = fold(q).strip()
+        haystack = func.f_unaccent(func.lower(Reservation.client_name))
+        stmt = (
+            select(Reservation)
+            .where(haystack.like(_like_pattern(q), escape="\\"))
+            .order_by(func.word_similarity(folded, haystack).desc(), Reservation.service_date.desc())
+            .limit(limit)
+        )
+        return list(session.exec(stmt).all())
+
+    match = _fts_query(q)
+    if not match:
+        return []
+    ranked = session.exec(text(
+        f"""
+        SELECT r.id FROM {SQLITE_FTS_TABLE}
+        JOIN reservation r ON r.id = {SQLITE_FTS_TABLE}.id
+        WHERE {SQLITE_FTS_TABLE} MATCH :fts_q
+        ORDER BY bm25({SQLITE_FTS_TABLE}), r.service_date DESC
+        LIMIT :limit
+        """
+    ).bindparams(fts_q=match, limit=limit)).all()
+    ids = [uuid.UUID(str(row[0])) for row in ranked]
+    if not ids:
+        return []
+    by_id = {r.id: r for r in session.exec(select(Reservation).where(Reservation.id.in_(ids))).all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+# --- Menu catalogue autocomplete ---
+
+MENU_INDEX_TTL_SECONDS = 60
+
+
+def _trigrams(s: str) -> Set[str]:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _fold_type(t: str) -> str:
+    t = fold(t).strip()
+    return "entree" if t == "entrees" else t
+
+
+def _occurrences(text: str, sub: str) -> Iterator[int]:
+    at = text.find(sub)
+    while at >= 0:
+        yield at
+        at = text.find(sub, at + 1)
+
+
+class MenuIndex:
+    """Process-local prefix/trigram index over active MenuItem rows.
+
+    Built lazily from the DB, dropped by invalidate() on every menu write in this process,
+    and rebuilt after MENU_INDEX_TTL_SECONDS so writes made by other workers show up too.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self._generation = 0
+        self._items: List[MenuItemRead] = []
+        self._names: List[str] = []
+        self._types: List[str] = []
+        self._words: List[Tuple[str, int]] = []
+        self._grams: Dict[str, Set[int]] = {}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = 0.0
+            self._generation += 1
+
+    def _build(self, session: Session) -> None:
+        # Query and build without the lock (with an async session the query yields to other requests),
+        # then swap the new index in
+        with self._lock:
+            generation = self._generation
+        rows = session.exec(select(MenuItem).where(MenuItem.active == True).order_by(MenuItem.name.asc())).all()
+        items = [MenuItemRead.model_validate(r) for r in rows]
+        names = [fold(it.name) for it in items]
+        words: List[Tuple[str, int]] = []
+        grams: Dict[str, Set[int]] = {}
+        for idx, name in enumerate(names):
+            for w in re.findall(r"\w+", name):
+                words.append((w, idx))
+            for g in _trigrams(name):
+                grams.setdefault(g, set()).add(idx)
+        words.sort()
+        types = [_fold_type(it.type) for it in items]
+        with self._lock:
+            self._items, self._names, self._types = items, names, types
+            self._words, self._grams = words, grams
+            # Invalidated while building: serve this index once, rebuild on the next search
+            self._built_at = time.monotonic() if generation == self._generation else 0.0
+
+    def _ensure(self, session: Session) -> None:
+        with self._lock:
+            fresh = self._built_at and time.monotonic() - self._built_at <= MENU_INDEX_TTL_SECONDS
+        if not fresh:
+            self._build(session)
+
+    def search(self, session: Session, q: Optional[str], type: Optional[str], limit: int = 20) -> List[MenuItemRead]:
+        self._ensure(session)
+        with self._lock:
+            items, names, types = self._items, self._names, self._types
+            words, grams = self._words, self._grams
+        wanted_type = _fold_type(type) if type else None
+        fq = fold(q or "").strip()
+
+        def type_ok(idx: int) -> bool:
+            return wanted_type is None or types[idx] == wanted_type
+
+        if not fq:
+            return [items[i] for i in range(len(items)) if type_ok(i)][:limit]
+
+        # rank 0: name starts with q, rank 1: a word starts with q, rank 2: q appears inside the name
+        ranks: Dict[int, int] = {}
+        pos = bisect.bisect_left(words, (fq, -1))
+        while pos < len(words) and words[pos][0].startswith(fq):
+            idx = words[pos][1]
+            ranks[idx] = 0 if names[idx].startswith(fq) else 1
+            pos += 1
+        if len(fq) >= 3:
+            postings = [grams.get(g, set()) for g in _trigrams(fq)]
+            candidates = set.intersection(*postings) if postings else set()
+        else:
+            candidates = set(range(len(names)))
+        # The word walk above misses multi-word queries ("creme b"): rank candidates on the full name
+        for idx in candidates:
+            if idx in ranks:
+                continue
+            name = names[idx]
+            at = name.find(fq)
+            if at < 0:
+                continue
+            if at == 0:
+                ranks[idx] = 0
+            elif any(not name[p - 1].isalnum() for p in _occurrences(name, fq)):
+                ranks[idx] = 1
+            else:
+                ranks[idx] = 2
+        hits = sorted((r, names[i], i) for i, r in ranks.items() if type_ok(i))
+        return [items[i] for _, _, i in hits[:limit]]
+
+
+menu_index = MenuIndex()
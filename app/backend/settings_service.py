@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from sqlmodel import Session, select
+
+from .database import session_context
+from .models import Setting, ZenchefSettings
+
+# Settings read through a process-level cache of the whole setting table.
+# Every write through set_settings() stamps a new settings_version in the same
+# transaction; readers compare their stamp with the DB at most once every
+# SETTINGS_VERSION_CHECK_SECONDS, so other workers' writes are picked up within
+# that delay and hot paths (sync, scheduler) otherwise never query the DB.
+SETTINGS_VERSION_CHECK_SECONDS = float(os.getenv("SETTINGS_VERSION_CHECK_SECONDS", "5"))
+VERSION_KEY = "settings_version"
+
+ZENCHEF_API_TOKEN = "zenchef_api_token"
+ZENCHEF_RESTAURANT_ID = "zenchef_restaurant_id"
+
+
+def get_setting(session: Session, key: str) -> Optional[str]:
+    """Uncached read, for state that must be exact (sync watermarks, lock rows)."""
+    row = session.get(Setting, key)
+    return row.value if row else None
+
+
+def set_setting(session: Session, key: str, value: str) -> None:
+    set_settings(session, {key: value})
+
+
+def set_state(session: Session, key: str, value: str) -> None:
+    """Write internal state (sync watermarks) without bumping the version stamp.
+
+    Such keys are read with get_setting, so no worker's cache needs to reload for them.
+    """
+    row = session.get(Setting, key)
+    if row:
+        row.value = value
+        session.add(row)
+    else:
+        session.add(Setting(key=key, value=value))
+    session.commit()
+
+
+def set_settings(session: Session, values: Dict[str, str]) -> None:
+    """Write several keys and bump the version stamp in one transaction."""
+    version = uuid.uuid4().hex
+    for key, value in {**values, VERSION_KEY: version}.items():
+        row = session.get(Setting, key)
+        if row:
+            row.value = value
+            session.add(row)
+        else:
+            session.add(Setting(key=key, value=value))
+    session.commit()
+    settings_cache.apply(values, version)
+
+
+class SettingsCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, str] = {}
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = 0.0
+            self._version = None
+
+    def apply(self, values: Dict[str, str], version: str) -> None:
+        # Local write: no need to reload; other workers see the new stamp
+        with self._lock:
+            if self._version is not None:
+                self._values.update(values)
+                self._version = version
+
+    def _refresh(self, session: Session) -> None:
+        row = session.get(Setting, VERSION_KEY)
+        version = row.value if row else ""
+        if version != self._version:
+            rows = session.exec(select(Setting)).all()
+            self._values = {r.key: r.value for r in rows}
+            self._version = version
+        self._checked_at = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self._version is None or time.monotonic() - self._checked_at >= SETTINGS_VERSION_CHECK_SECONDS:
+                with session_context() as session:
+                    self._refresh(session)
+            return self._values.get(key)
+
+    def zenchef(self) -> ZenchefSettings:
+        return ZenchefSettings(api_token=self.get(ZENCHEF_API_TOKEN), restaurant_id=self.get(ZENCHEF_RESTAURANT_ID))
+
+
+settings_cache = SettingsCache()
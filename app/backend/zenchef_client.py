@@ -0,0 +1,95 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# Async Zenchef API client: one pooled keep-alive connection set per sync,
+# pages fetched concurrently (bounded) and yielded in order to the DB writer.
+ZENCHEF_API_URL = os.getenv("ZENCHEF_API_URL", "https://api.zenchef.com/v1")
+ZENCHEF_MAX_IN_FLIGHT = int(os.getenv("ZENCHEF_MAX_IN_FLIGHT", "4"))
+ZENCHEF_MAX_RETRIES = int(os.getenv("ZENCHEF_MAX_RETRIES", "4"))
+ZENCHEF_TIMEOUT_SECONDS = float(os.getenv("ZENCHEF_TIMEOUT_SECONDS", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ZenchefError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(f"Zenchef API error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _retry_delay(resp: Optional[httpx.Response], attempt: int) -> float:
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), 30.0)
+    return min(0.5 * (2 ** attempt), 8.0)
+
+
+async def _get_json(client: httpx.AsyncClient, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """GET with retry and exponential backoff on 429/5xx and transport errors."""
+    for attempt in range(ZENCHEF_MAX_RETRIES + 1):
+        resp: Optional[httpx.Response] = None
+        try:
+            resp = await client.get(path, params=params)
+        except httpx.TransportError as e:
+            if attempt == ZENCHEF_MAX_RETRIES:
+                raise ZenchefError(502, str(e))
+        else:
+            if resp.status_code < 400:
+                return resp.json() or {}
+            if resp.status_code not in RETRY_STATUSES or attempt == ZENCHEF_MAX_RETRIES:
+                raise ZenchefError(resp.status_code, resp.text)
+        await asyncio.sleep(_retry_delay(resp, attempt))
+    raise ZenchefError(502, "retries exhausted")
+
+
+def make_client(token: str, base_url: Optional[str] = None, max_in_flight: Optional[int] = None) -> httpx.AsyncClient:
+    n = max_in_flight or ZENCHEF_MAX_IN_FLIGHT
+    return httpx.AsyncClient(
+        base_url=base_url or ZENCHEF_API_URL,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        timeout=ZENCHEF_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=n, max_keepalive_connections=n),
+    )
+
+
+async def iter_reservation_pages(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    per_page: int,
+    max_in_flight: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the reservations of each page, in page order.
+
+    Page 1 is fetched alone, so a one-page sync costs a single request. Each full page
+    then doubles the number of pages requested ahead (up to max_in_flight); the first
+    short page marks the end and every speculative request past it is cancelled.
+    """
+    max_window = max(1, max_in_flight or ZENCHEF_MAX_IN_FLIGHT)
+    window = 1
+    pending: Dict[int, asyncio.Task] = {}
+    next_page = 1
+    expected = 1
+    try:
+        while True:
+            while len(pending) < window:
+                pending[next_page] = asyncio.create_task(
+                    _get_json(client, "/reservations", {**params, "perPage": per_page, "page": next_page})
+                )
+                next_page += 1
+            data = await pending.pop(expected)
+            reservations = data.get("reservations", [])
+            yield reservations
+            # pagination end condition
+            if not reservations or len(reservations) < per_page:
+                return
+            expected += 1
+            window = min(max_window, window * 2)
+    finally:
+        for task in pending.values():
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending.values(), return_exceptions=True)
@@ -0,0 +1,443 @@
+import asyncio
+import datetime as dt
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from .aggregates import Footprint, apply_aggregates, footprint
+from .database import engine, session_context
+from .models import Reservation, ReservationItem, ReservationStatus, Setting, SyncRun
+from .settings_service import get_setting, set_state, settings_cache
+from .zenchef_client import iter_reservation_pages, make_client
+
+# Zenchef import engine, shared by POST /api/zenchef/sync and the background scheduler.
+# Runs are single-flight across workers (PostgreSQL advisory lock, or a lock row in
+# the setting table elsewhere) and every run is recorded in the syncrun table.
+ZENCHEF_SYNC_INTERVAL_SECONDS = int(os.getenv("ZENCHEF_SYNC_INTERVAL_SECONDS", "0"))
+ZENCHEF_SYNC_DAYS_AHEAD = int(os.getenv("ZENCHEF_SYNC_DAYS_AHEAD", "60"))
+SYNC_LOCK_KEY = "zenchef_sync_lock"
+SYNC_LOCK_TTL_SECONDS = 30 * 60
+PG_SYNC_LOCK_ID = 72_410_001
+
+
+class SyncBusy(Exception):
+    """Another worker is already running a sync."""
+
+
+class SyncConfigError(Exception):
+    """Zenchef credentials are missing."""
+
+
+def parse_start_time(iso: str) -> tuple[str, str]:
+    # Expect ISO like 2025-10-15T19:30:00Z or with offset
+    try:
+        # Remove Z for fromisoformat if present
+        clean = iso.replace("Z", "+00:00") if iso.endswith("Z") else iso
+        dt_obj = dt.datetime.fromisoformat(clean)
+        return dt_obj.date().isoformat(), dt_obj.time().strftime("%H:%M")
+    except Exception:
+        # fallback: split on 'T'
+        if "T" in iso:
+            d, t = iso.split("T", 1)
+            return d[:10], t[:5]
+        return iso[:10], "00:00"
+
+
+def _to_reservation(r: Dict[str, Any]) -> Reservation:
+    d_str, t_str = parse_start_time(r.get("startTime", ""))
+    pax = int(r.get("numberOfPeople") or 0)
+    if pax < 1:
+        pax = 1
+    if pax > 500:
+        pax = 500
+    customer = r.get("customer") or {}
+    client_name = (customer.get("firstname") or "").strip() + " " + (customer.get("lastname") or "").strip()
+    client_name = client_name.strip() or "Groupe"
+    if len(client_name) > 200:
+        client_name = client_name[:200]
+    return Reservation(
+        client_name=client_name,
+        pax=pax,
+        service_date=dt.date.fromisoformat(d_str),
+        arrival_time=dt.time.fromisoformat(t_str),
+        drink_formula="Sans alcool",
+        notes="Import Zenchef",
+        status=ReservationStatus.confirmed,
+        zenchef_id=str(r["id"]) if r.get("id") is not None else None,
+    )
+
+
+CANCELLED_STATUSES = {"cancelled", "canceled", "refused", "no_show"}
+
+
+def _is_cancelled(r: Dict[str, Any]) -> bool:
+    return str(r.get("status") or "").lower() in CANCELLED_STATUSES
+
+
+def _apply_changes(session: Session, reservations: List[Dict[str, Any]]) -> tuple[int, int, set]:
+    """Apply Zenchef updates/cancellations to groups imported earlier (matched on zenchef_id).
+
+    Returns (updated, deleted, handled ids); changes are left in the session for the page commit.
+    """
+    zids = {str(r["id"]) for r in reservations if r.get("id") is not None}
+    if not zids:
+        return 0, 0, set()
+    # Locked until the page commit so API edits of the same rows cannot skew the day totals
+    known = {row.zenchef_id: row for row in session.exec(
+        select(Reservation).where(Reservation.zenchef_id.in_(zids)).order_by(Reservation.id).with_for_update()
+    ).all()}
+    items_by_res: Dict[uuid.UUID, List[ReservationItem]] = {row.id: [] for row in known.values()}
+    if known:
+        for it in session.exec(select(ReservationItem).where(ReservationItem.reservation_id.in_(list(items_by_res)))).all():
+            items_by_res[it.reservation_id].append(it)
+    before: List[Footprint] = []
+    after: List[Footprint] = []
+    updated = deleted = 0
+    for r in reservations:
+        row = known.get(str(r.get("id")))
+        if row is None:
+            continue
+        if _is_cancelled(r) or (r.get("numberOfPeople") or 0) <= 10:
+            # No longer a large group for the kitchen
+            before.append(footprint(row, items_by_res[row.id]))
+            session.exec(delete(ReservationItem).where(ReservationItem.reservation_id == row.id))
+            session.delete(row)
+            deleted += 1
+            continue
+        fresh = _to_reservation(r)
+        changes = {
+            k: getattr(fresh, k) for k in ("client_name", "pax", "service_date", "arrival_time")
+            if getattr(fresh, k) != getattr(row, k)
+        }
+        if not changes:
+            continue
+        new_key = (fresh.service_date, fresh.arrival_time, fresh.client_name, fresh.pax)
+        clash = session.exec(select(Reservation.id).where(
+            Reservation.service_date == new_key[0],
+            Reservation.arrival_time == new_key[1],
+            Reservation.client_name == new_key[2],
+            Reservation.pax == new_key[3],
+            Reservation.id != row.id,
+        )).first()
+        if clash:
+            print(f"Zenchef update skipped for {row.zenchef_id}: slot already taken")
+            continue
+        before.append(footprint(row, items_by_res[row.id]))
+        for k, v in changes.items():
+            setattr(row, k, v)
+        row.updated_at = dt.datetime.utcnow()
+        session.add(row)
+        after.append(footprint(row, items_by_res[row.id]))
+        updated += 1
+    apply_aggregates(session, before, after)
+    session.flush()
+    return updated, deleted, set(known)
+
+
+def _import_page(session: Session, candidates: List[Reservation]) -> List[Dict[str, Any]]:
+    """Insert one page of imported bookings in a single statement and commit the page.
+
+    De-dup on (service_date, arrival_time, client_name, pax): first within the page, then
+    against one range query on existing rows; ON CONFLICT DO NOTHING / INSERT OR IGNORE
+    covers concurrent imports racing on the unique constraint.
+    """
+    if not candidates:
+        session.commit()
+        return []
+    existing = set(session.exec(
+        select(Reservation.service_date, Reservation.arrival_time, Reservation.client_name, Reservation.pax).where(
+            Reservation.service_date.between(
+                min(c.service_date for c in candidates), max(c.service_date for c in candidates)
+            ),
+            Reservation.client_name.in_({c.client_name for c in candidates}),
+        )
+    ).all())
+    rows: List[Dict[str, Any]] = []
+    for c in candidates:
+        key = (c.service_date, c.arrival_time, c.client_name, c.pax)
+        if key in existing:
+            continue
+        existing.add(key)
+        rows.append(c.model_dump())
+    if not rows:
+        session.commit()
+        return []
+
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        stmt = pg_insert(Reservation).values(rows).on_conflict_do_nothing()
+    elif bind.dialect.name == "sqlite":
+        stmt = sqlite_insert(Reservation).values(rows).prefix_with("OR IGNORE")
+    else:
+        stmt = insert(Reservation).values(rows)
+    if bind.dialect.insert_returning:
+        inserted_ids = set(session.exec(stmt.returning(Reservation.id)).scalars().all())
+    else:
+        session.exec(stmt)
+        inserted_ids = {r["id"] for r in rows}
+    apply_aggregates(session, [], [
+        (r["service_date"], r["arrival_time"], r["pax"], None) for r in rows if r["id"] in inserted_ids
+    ])
+    session.commit()
+    return [
+        {
+            "id": str(r["id"]),
+            "client_name": r["client_name"],
+            "service_date": r["service_date"].isoformat(),
+            "arrival_time": r["arrival_time"].strftime("%H:%M"),
+            "pax": r["pax"],
+        }
+        for r in rows if r["id"] in inserted_ids
+    ]
+
+
+def _sync_page(session: Session, reservations: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], int, int]:
+    """One transaction per page: apply changes to known groups, then bulk-insert the new ones."""
+    updated, deleted, handled = _apply_changes(session, reservations)
+    # Filter > 10 people
+    big = [
+        r for r in reservations
+        if (r.get("numberOfPeople") or 0) > 10 and not _is_cancelled(r) and str(r.get("id")) not in handled
+    ]
+    created = _import_page(session, [_to_reservation(r) for r in big])
+    return created, updated, deleted
+
+
+def _max_updated_at(current: Optional[str], reservations: List[Dict[str, Any]]) -> Optional[str]:
+    def parse(v: str) -> Optional[dt.datetime]:
+        try:
+            return dt.datetime.fromisoformat(v.replace("Z", "+00:00"))
+        except Exception:
+            return None
+    best = current
+    best_dt = parse(current) if current else None
+    for r in reservations:
+        v = r.get("updatedAt")
+        v_dt = parse(v) if isinstance(v, str) else None
+        if v_dt and (best_dt is None or v_dt > best_dt):
+            best, best_dt = v, v_dt
+    return best
+
+
+def _acquire_lock() -> Optional[Any]:
+    """Try to take the sync lock without waiting; returns a handle for _release_lock, or None."""
+    if engine.url.get_backend_name() == "postgresql":
+        conn = engine.connect()
+        try:
+            if conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": PG_SYNC_LOCK_ID}).scalar():
+                conn.commit()
+                return conn
+        except Exception:
+            pass
+        conn.close()
+        return None
+
+    # Lock row: value is "<expiry>|<owner>", an expired or empty value can be taken over
+    now = dt.datetime.utcnow()
+    fmt = "%Y-%m-%dT%H:%M:%S.%f"
+    owner = uuid.uuid4().hex
+    mine = f"{(now + dt.timedelta(seconds=SYNC_LOCK_TTL_SECONDS)).strftime(fmt)}|{owner}"
+    with session_context() as session:
+        if session.get(Setting, SYNC_LOCK_KEY) is None:
+            try:
+                session.add(Setting(key=SYNC_LOCK_KEY, value=""))
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+        result = session.exec(
+            update(Setting)
+            .where(Setting.key == SYNC_LOCK_KEY, Setting.value < now.strftime(fmt))
+            .values(value=mine)
+        )
+        session.commit()
+        return mine if result.rowcount == 1 else None
+
+
+def _release_lock(handle: Any) -> None:
+    if handle is None:
+        return
+    if isinstance(handle, str):
+        with session_context() as session:
+            session.exec(update(Setting).where(Setting.key == SYNC_LOCK_KEY, Setting.value == handle).values(value=""))
+            session.commit()
+        return
+    try:
+        handle.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": PG_SYNC_LOCK_ID})
+        handle.commit()
+    finally:
+        handle.close()
+
+
+def _start_run(trigger: str) -> uuid.UUID:
+    with session_context() as session:
+        run = SyncRun(trigger=trigger)
+        session.add(run)
+        session.commit()
+        return run.id
+
+
+def _finish_run(run_id: uuid.UUID, started: float, **fields: Any) -> Dict[str, Any]:
+    with session_context() as session:
+        run = session.get(SyncRun, run_id)
+        for k, v in fields.items():
+            setattr(run, k, v)
+        run.finished_at = dt.datetime.utcnow()
+        run.duration_ms = int((time.monotonic() - started) * 1000)
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+        return run.model_dump()
+
+
+def last_runs(session: Session, limit: int = 1) -> List[SyncRun]:
+    return list(session.exec(select(SyncRun).order_by(SyncRun.started_at.desc()).limit(limit)).all())
+
+
+def _recently_synced(interval: int) -> bool:
+    with session_context() as session:
+        runs = last_runs(session)
+    if not runs or runs[0].status != "ok":
+        return False
+    return (dt.datetime.utcnow() - runs[0].started_at).total_seconds() < interval * 0.9
+
+
+async def _sync(session: Session, body: Dict[str, Any], stats: Dict[str, int]) -> Dict[str, Any]:
+    # DB work runs in the threadpool; Zenchef pages are fetched concurrently on the event loop
+    config = await run_in_threadpool(settings_cache.zenchef)
+    token, restaurant_id = config.api_token, config.restaurant_id
+    if not token or not restaurant_id:
+        raise SyncConfigError("Zenchef settings missing: api_token and restaurant_id are required")
+
+    from_date: str = body.get("fromDate") or dt.date.today().isoformat()
+    to_date: str = body.get("toDate") or from_date
+    per_page = int(body.get("perPage") or 250)
+
+    # Incremental mode: only bookings changed since the stored watermark (last updatedAt seen).
+    # Without a watermark yet, the first run covers the date window and records one.
+    incremental = bool(body.get("incremental"))
+    watermark_key = f"zenchef_watermark_{restaurant_id}"
+    watermark = await run_in_threadpool(get_setting, session, watermark_key) if incremental else None
+    if watermark:
+        params = {"restaurantId": restaurant_id, "updatedSince": watermark}
+    else:
+        params = {"restaurantId": restaurant_id, "fromDate": from_date, "toDate": to_date}
+
+    created: List[Dict[str, Any]] = []
+    updated = deleted = 0
+    new_watermark = watermark
+    async with make_client(token) as client:
+        async for reservations in iter_reservation_pages(client, params, per_page):
+            stats["pages"] += 1
+            # The next pages keep downloading while this one is written
+            if not reservations:
+                continue
+            page_created, page_updated, page_deleted = await run_in_threadpool(_sync_page, session, reservations)
+            created.extend(page_created)
+            updated += page_updated
+            deleted += page_deleted
+            stats.update(inserted=len(created), updated=updated, deleted=deleted)
+            new_watermark = _max_updated_at(new_watermark, reservations)
+    if incremental and new_watermark and new_watermark != watermark:
+        # Not a user setting: leave settings_version alone so no worker reloads its cache
+        await run_in_threadpool(set_state, session, watermark_key, new_watermark)
+
+    return {
+        "created": created,
+        "count": len(created),
+        "updated": updated,
+        "deleted": deleted,
+        "fromDate": None if watermark else from_date,
+        "toDate": None if watermark else to_date,
+        "updatedSince": watermark,
+        "watermark": new_watermark if incremental else None,
+    }
+
+
+async def run_sync(body: Dict[str, Any], trigger: str = "manual", min_interval: int = 0) -> Dict[str, Any]:
+    """Run one recorded, single-flight sync. Raises SyncBusy when another run holds the lock."""
+    handle = await run_in_threadpool(_acquire_lock)
+    if handle is None:
+        raise SyncBusy()
+    try:
+        if min_interval and await run_in_threadpool(_recently_synced, min_interval):
+            # Another worker's scheduler already covered this interval
+            return {"skipped": True}
+        run_id = await run_in_threadpool(_start_run, trigger)
+        started = time.monotonic()
+        stats = {"pages": 0, "inserted": 0, "updated": 0, "deleted": 0}
+        try:
+            with session_context() as session:
+                result = await _sync(session, body, stats)
+        except asyncio.CancelledError:
+            # Shutdown while syncing: pages already written stay committed
+            _finish_run(run_id, started, status="cancelled", **stats)
+            raise
+        except Exception as e:
+            await run_in_threadpool(_finish_run, run_id, started, status="failed", error=str(e)[:2000], **stats)
+            raise
+        result["run"] = await run_in_threadpool(_finish_run, run_id, started, status="ok", **stats)
+        return result
+    finally:
+        await run_in_threadpool(_release_lock, handle)
+
+
+# --- Background scheduler ---
+
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+def _configured() -> bool:
+    config = settings_cache.zenchef()
+    return bool(config.api_token and config.restaurant_id)
+
+
+async def _scheduler_loop(interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        if not await run_in_threadpool(_configured):
+            continue
+        today = dt.date.today()
+        body = {
+            "incremental": True,
+            "fromDate": today.isoformat(),
+            "toDate": (today + dt.timedelta(days=ZENCHEF_SYNC_DAYS_AHEAD)).isoformat(),
+        }
+        try:
+            await run_sync(body, trigger="schedule", min_interval=interval)
+        except SyncBusy:
+            pass
+        except Exception as e:
+            print(f"Scheduled Zenchef sync failed: {e}")
+
+
+def start_scheduler() -> None:
+    global _scheduler_task
+    if ZENCHEF_SYNC_INTERVAL_SECONDS > 0 and _scheduler_task is None:
+        _scheduler_task = asyncio.get_running_loop().create_task(_scheduler_loop(ZENCHEF_SYNC_INTERVAL_SECONDS))
+
+
+async def stop_scheduler() -> None:
+    global _scheduler_task
+    if _scheduler_task is not None:
+        _scheduler_task.cancel()
+        try:
+            await _scheduler_task
+        except asyncio.CancelledError:
+            pass
+        _scheduler_task = None
+
+
+def scheduler_status() -> Dict[str, Any]:
+    return {
+        "enabled": ZENCHEF_SYNC_INTERVAL_SECONDS > 0,
+        "interval_seconds": ZENCHEF_SYNC_INTERVAL_SECONDS,
+        "running": _scheduler_task is not None and not _scheduler_task.done(),
+    }